@@ -12,29 +12,36 @@ os.system("pip install fer==20.0.0 mtcnn tensorflow==2.12.0")
 
 import os
 import json
+import uuid
 import streamlit as st
 from datetime import datetime
 import pandas as pd
 
 # Multimodal Emotion Engine
-from multimodal_emotion.video_emotion import analyze_video_frame
-from multimodal_emotion.audio_emotion import analyze_audio
-from multimodal_emotion.text_emotion import analyze_text
-from multimodal_emotion.fusion import fuse
+from multimodal_emotion.engine import get_engine
+from multimodal_emotion.memo import content_hash
 
 # Adaptive Learning Brain
-from multimodal_brain.brain import analyze_state
+from multimodal_brain.brain import analyze_state, state_store
+from multimodal_brain.episodes import detect_episodes
 
 # Session Manager + DB
-from session_system.session_manager import session_manager
+from session_system.session_manager import SessionManager
+from session_system.journal import journal_segments, read_journal, session_path
 from session_system.db import get_db
+from session_system.analytics import compute_session_metrics, get_analytics
+from session_system.rollup import SessionRollup, load_rollup
+from session_system.archive import events_to_frame, write_archive
+from session_system.cohort import CohortAnalyzer
 
 # LLM generator
-from assistant_engine.generator import generate_teaching_reply
+from assistant_engine.generator import stream_teaching_reply
+from assistant_engine.cache import get_reply_cache
 
 # ---- Config ----
 st.set_page_config(page_title="EmoLens — Live + Dashboard", layout="wide")
 DB = get_db()
+ANALYTICS = get_analytics(DB)
 
 # --------------------------
 # Theme / small animations
@@ -123,6 +130,12 @@ def fetch_latest_rows(limit=50):
         return []
 
 def fetch_sessions(limit=100):
+    # distinct sessions + last timestamp, computed by the database
+    if ANALYTICS:
+        try:
+            return ANALYTICS.list_sessions(limit=limit)
+        except Exception as e:
+            st.warning(f"Session listing fell back to row scan: {e}")
     rows = fetch_latest_rows(limit=200)
     sessions = {}
     for r in rows:
@@ -134,6 +147,35 @@ def fetch_sessions(limit=100):
     out = sorted(sessions.values(), key=lambda x: x["timestamp"], reverse=True)
     return out[:limit]
 
+def fetch_session_metrics(session_id, rows):
+    if ANALYTICS:
+        try:
+            metrics = ANALYTICS.session_metrics(session_id)
+            if metrics:
+                return metrics
+        except Exception:
+            pass
+    return compute_session_metrics(rows)
+
+def load_session_rollup(session_id):
+    rollup = load_rollup(session_id)
+    if rollup is None and ANALYTICS:
+        try:
+            row = ANALYTICS.session_rollup(session_id)
+            if row:
+                rollup = SessionRollup.from_dict(row)
+        except Exception:
+            pass
+    return rollup
+
+def count_rows():
+    if ANALYTICS:
+        try:
+            return ANALYTICS.count_rows()
+        except Exception as e:
+            st.warning(f"Exact count failed, scanning rows instead: {e}")
+    return len(fetch_latest_rows(5000))
+
 def fetch_session_rows(session_id, limit=1000):
     if DB:
         try:
@@ -141,7 +183,11 @@ def fetch_session_rows(session_id, limit=1000):
             return resp.data or []
         except Exception:
             pass
-    path = f"session_{session_id}.json"
+    # journaled sessions stream back line by line, only up to `limit`
+    path = session_path(session_id, "journal")
+    if journal_segments(path):
+        return list(read_journal(path, limit=limit))
+    path = session_path(session_id)
     if os.path.exists(path):
         return json.load(open(path, "r"))
     return []
@@ -149,24 +195,19 @@ def fetch_session_rows(session_id, limit=1000):
 ###############################
 #   Analytics Helper Methods   #
 ###############################
-def compute_session_metrics(rows):
-    if not rows:
-        return {}
-    valences, arousals, emotions = [], [], {}
-    for r in rows:
-        fe = r.get("fused_emotion") or {}
-        v = fe.get("valence", r.get("valence", 0))
-        a = fe.get("arousal", r.get("arousal", 0))
-        e = fe.get("emotion", r.get("emotion", "unknown"))
-        valences.append(v)
-        arousals.append(a)
-        emotions[e] = emotions.get(e, 0) + 1
-    return {
-        "avg_valence": sum(valences)/len(valences) if valences else 0,
-        "avg_arousal": sum(arousals)/len(arousals) if arousals else 0,
-        "dominant_emotion": max(emotions, key=emotions.get) if emotions else "n/a",
-        "events": len(rows)
-    }
+def get_session_manager():
+    # one manager per browser session: every student gets their own client id
+    # (part of every event key), session id, timeline, rollup and
+    # recent-event filter (DB writers are shared)
+    if "session_manager" not in st.session_state:
+        client_id = st.session_state.setdefault("client_id", uuid.uuid4().hex)
+        st.session_state["session_manager"] = SessionManager(client_id=client_id)
+    return st.session_state["session_manager"]
+
+@st.cache_resource
+def get_cohort_analyzer():
+    # one analyzer per server process so its content-hash cache survives reruns
+    return CohortAnalyzer()
 
 def detect_spikes(rows, valence_drop=-0.4, arousal_rise=0.5):
     spikes = []
@@ -204,47 +245,37 @@ if page == "Student (Live)":
         st.markdown("### Suggested Micro-Action")
         action_placeholder = st.empty()
 
-    # Process inputs (safe calls)
-    video_res = None
-    audio_res = None
-    text_res = None
-
-    if camera_bytes:
-        try:
-            video_res = analyze_video_frame(camera_bytes.getvalue())
-        except Exception as e:
-            st.warning("Video analyze error: " + str(e))
-
-    if audio_file:
-        try:
-            audio_res = analyze_audio(audio_file.getvalue())
-        except Exception as e:
-            st.warning("Audio analyze error: " + str(e))
-
-    if text_input and text_input.strip():
-        try:
-            text_res = analyze_text(text_input)
-        except Exception as e:
-            st.warning("Text analyze error: " + str(e))
-
-    # Fuse modalities
+    # Process inputs: the three analyzers run concurrently in the scoring engine
     try:
-        fusion = fuse(video=video_res, audio=audio_res, text=text_res)
+        fusion = get_engine().score(
+            video=camera_bytes.getvalue() if camera_bytes else None,
+            audio=audio_file.getvalue() if audio_file else None,
+            text=text_input if text_input and text_input.strip() else None,
+        )
     except Exception as e:
         fusion = None
-        st.warning("Fusion error: " + str(e))
-
+        st.warning("Scoring error: " + str(e))
 
+    session_manager = get_session_manager()
     if fusion:
-        brain_out = analyze_state(fusion)
-        session_manager.log(fusion, brain_out)
+        session_id = session_manager.session_id or session_manager.start_session()
+
+        # a rerun with unchanged inputs is the same interaction: same sequence
+        # number, same event key, so it is neither re-analyzed nor re-logged
+        input_hashes = (
+            content_hash("video", camera_bytes.getvalue()) if camera_bytes else None,
+            content_hash("audio", audio_file.getvalue()) if audio_file else None,
+            content_hash("text", text_input) if text_input and text_input.strip() else None,
+        )
+        if st.session_state.get("input_hashes") != (session_id, input_hashes):
+            st.session_state["input_hashes"] = (session_id, input_hashes)
+            st.session_state["event_seq"] = st.session_state.get("event_seq", 0) + 1
+            st.session_state["brain_out"] = analyze_state(fusion, session_id)
+        brain_out = st.session_state["brain_out"]
+        session_manager.log(fusion, brain_out, input_hashes=input_hashes, seq=st.session_state["event_seq"])
 
-    # LLM Reply (only when user asked)
-    if fusion and user_query and user_query.strip():
-        try:
-            ai_reply = generate_teaching_reply(user_query.strip(), fusion, brain_out)
-        except Exception as e:
-            ai_reply = f"[LLM ERROR] {e}"
+    # LLM Reply (only when user asked) — streamed below as it arrives
+    ask_llm = bool(fusion and user_query and user_query.strip())
 
     # Suggest action function
     def suggest_action(ev):
@@ -289,13 +320,17 @@ if page == "Student (Live)":
         st.markdown('<div class="emolens-card">', unsafe_allow_html=True)
         for name, m in fusion.modalities.items():
             st.write(f"**{name.upper()}**")
-            st.write(vars(m))
+            st.write(m.to_dict())
         st.markdown('</div>', unsafe_allow_html=True)
 
         # LLM response (if any)
-        if ai_reply:
+        if ask_llm:
             st.markdown("### 🤖 Adaptive AI Response")
-            st.markdown(f"<div class='emolens-card'><pre style='white-space:pre-wrap'>{ai_reply}</pre></div>", unsafe_allow_html=True)
+            try:
+                ai_reply = st.write_stream(stream_teaching_reply(user_query.strip(), fusion, brain_out))
+            except Exception as e:
+                ai_reply = f"[LLM ERROR] {e}"
+                st.error(ai_reply)
 
         if camera_bytes:
             st.image(camera_bytes, caption="Captured Frame", use_column_width=True)
@@ -304,7 +339,10 @@ if page == "Student (Live)":
 
     st.markdown("---")
     if st.button("End Session & Save Timeline"):
+        ended = session_manager.session_id
         path = session_manager.end_session()
+        if ended:
+            state_store.drop(ended)
         st.success(f"Session saved → {path}")
 
 
@@ -313,6 +351,28 @@ if page == "Student (Live)":
 ###########################################
 elif page == "Educator Dashboard":
     st.header("Educator Dashboard — Sessions & Timeline")
+
+    with st.expander("Cohort overview (local sessions & archives)"):
+        days = st.date_input("Only events between (optional)", value=(), key="cohort_days")
+        start = end = None
+        if len(days) == 2:
+            start = pd.Timestamp(days[0])
+            end = pd.Timestamp(days[1]) + pd.Timedelta(days=1) - pd.Timedelta(microseconds=1)
+        if st.button("Load cohort overview"):
+            per_session, cohort = get_cohort_analyzer().analyze_sessions(start=start, end=end)
+            if per_session.empty:
+                st.info("No local sessions found.")
+            else:
+                k1, k2, k3, k4 = st.columns(4)
+                k1.metric("Sessions", cohort["sessions"])
+                k2.metric("Events", cohort["events"])
+                k3.metric("Avg Valence", f"{cohort['avg_valence']:.2f}")
+                k4.metric("Spike Rate", f"{cohort['spike_rate']:.1%}")
+                st.bar_chart(pd.Series(cohort["emotion_mix"], name="share"))
+                st.dataframe(
+                    per_session[["events", "avg_valence", "avg_arousal", "spikes", "spike_rate", "dominant_emotion", "last_ts"]]
+                    .sort_values("spikes", ascending=False)
+                )
     col_left, col_right = st.columns([1, 2])
 
     # Session Picker
@@ -341,42 +401,54 @@ elif page == "Educator Dashboard":
             selected_id = sessions[0]['session_id']
 
         st.subheader(f"Session: {selected_id}")
-        rows = fetch_session_rows(selected_id)
-        if not rows:
-            st.warning("No rows for this session.")
-            st.stop()
 
-        metrics = compute_session_metrics(rows)
+        # metrics come from the incremental rollup when one exists;
+        # raw rows are only fetched when drilling into the timeline
+        rollup = load_session_rollup(selected_id)
+        rows = None
+        if rollup is not None and rollup.events:
+            metrics = rollup.metrics()
+        else:
+            rollup = None
+            rows = fetch_session_rows(selected_id)
+            if not rows:
+                st.warning("No rows for this session.")
+                st.stop()
+            metrics = fetch_session_metrics(selected_id, rows)
+
         c1, c2, c3, c4 = st.columns(4)
         c1.metric("Events", metrics["events"])
         c2.metric("Avg Valence", f"{metrics['avg_valence']:.2f}")
         c3.metric("Avg Arousal", f"{metrics['avg_arousal']:.2f}")
         c4.metric("Dominant Emotion", metrics["dominant_emotion"])
 
-        # Build timeline df
-        timestamps = []
-        vals, aros, labels = [], [], []
-        for r in rows:
-            fe = r.get("fused_emotion") or {}
-            ts = r.get("timestamp")
-            timestamps.append(ts)
-            vals.append(fe.get("valence", r.get("valence", 0)))
-            aros.append(fe.get("arousal", r.get("arousal", 0)))
-            labels.append(fe.get("emotion", r.get("emotion", "")))
-
-        df = pd.DataFrame({"timestamp": timestamps, "valence": vals, "arousal": aros, "emotion": labels})
-        df["timestamp"] = pd.to_datetime(df["timestamp"])
-        df = df.sort_values("timestamp")
-        st.markdown("## 📊 Valence & Arousal Timeline")
-        st.line_chart(df.set_index("timestamp")[["valence", "arousal"]])
-
         # Spikes
-        spikes = detect_spikes(rows)
+        spikes = rollup.spikes if rollup is not None else detect_spikes(rows)
         if spikes:
-            st.error(f"⚠️ Detected {len(spikes)} frustration spikes: {spikes}")
+            st.error(f"⚠️ Detected {len(spikes)} frustration spikes")
         else:
             st.success("No major spikes detected this session.")
 
+        if not st.checkbox("Show timeline & events", value=rollup is None):
+            st.stop()
+        if rows is None:
+            rows = fetch_session_rows(selected_id)
+            if not rows:
+                st.warning("No rows for this session.")
+                st.stop()
+
+        # Build timeline df (columnar flatten, no per-row loop)
+        df = events_to_frame(rows)[["timestamp", "valence", "arousal", "emotion"]]
+        df = df.sort_values("timestamp")
+        st.markdown("## 📊 Valence & Arousal Timeline")
+        st.line_chart(df.set_index("timestamp")[["valence", "arousal"]])
+
+        # Frustration episodes (windowed thresholds + hysteresis)
+        episodes = detect_episodes(df["valence"].fillna(0.0), df["arousal"].fillna(0.0), df["timestamp"])
+        if episodes:
+            st.markdown(f"## ⚠️ Frustration Episodes ({len(episodes)})")
+            st.dataframe(pd.DataFrame(episodes)[["start_ts", "end_ts", "duration", "events", "severity", "peak"]])
+
         # Events table
         st.markdown("## 🔍 Events (latest → oldest)")
         display_rows = []
@@ -396,6 +468,9 @@ elif page == "Educator Dashboard":
             fname = f"export_{selected_id}.json"
             json.dump(rows, open(fname, "w"), indent=2, default=str)
             st.success(f"Saved to {fname}")
+        if st.button("Export Parquet"):
+            fname = write_archive(rows, f"archive/session_{selected_id}.parquet", session_id=selected_id)
+            st.success(f"Saved to {fname}")
 
 #########################
 #   PAGE 3 — DB Test    #
@@ -409,12 +484,19 @@ elif page == "DB Test / Admin":
         st.write(fetch_latest_rows(10))
 
     if st.button("Count Rows"):
-        rows = fetch_latest_rows(5000)
-        st.write(f"Total Rows in emotion_logs: {len(rows)}")
+        st.write(f"Total Rows in emotion_logs: {count_rows()}")
+
+    st.markdown("### Analyzer memo")
+    memo = get_engine().memo
+    if memo is not None:
+        st.write({**memo.stats, "entries": len(memo)})
+
+    st.markdown("### LLM reply cache")
+    st.write({**get_reply_cache().stats, "entries": len(get_reply_cache())})
 
     st.markdown("### Local session files in root")
     for f in os.listdir("."):
-        if f.startswith("session_") and f.endswith(".json"):
+        if f.startswith("session_") and (f.endswith(".json") or ".jsonl" in f) and not f.endswith(".rollup.json"):
             st.write(f)
 
 
@@ -0,0 +1,261 @@
+# assistant_engine/cache.py
+"""
+Reply cache for generate_teaching_reply.
+
+- Keyed by the normalized question plus the teaching style and the brain's
+  engagement / load / predicted buckets, so Streamlit reruns with the same
+  question and state reuse the previous reply instead of calling the LLM.
+- In-memory LRU with a TTL; optionally backed by a SQLite file so replies
+  survive restarts.
+- Identical requests that arrive while one is already in flight wait for
+  that call instead of starting their own (single-flight), for both
+  blocking and streamed replies. A waiter gives up after wait_timeout
+  seconds (or when the leader fails) and makes the call itself, so a hung
+  call never blocks more than its own request.
+- Failed calls ("[LLM ERROR] ...") are never cached.
+"""
+
+import os
+import re
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+
+from assistant_engine.policy import pick_style
+
+ERROR_PREFIX = "[LLM ERROR]"
+
+
+def normalize_query(user_query):
+    """Lowercase, trim and collapse whitespace."""
+    return re.sub(r"\s+", " ", (user_query or "").strip().lower())
+
+
+def reply_key(user_query, emotion_state, brain_state, model=None):
+    style = pick_style(
+        getattr(emotion_state, "final_emotion", None),
+        brain_state.get("cognitive_load"),
+        brain_state.get("predicted_state")
+    )
+    parts = [
+        normalize_query(user_query),
+        style,
+        str(brain_state.get("engagement_level")),
+        str(brain_state.get("cognitive_load")),
+        str(brain_state.get("predicted_state")),
+        model or os.getenv("OPENAI_MODEL", "gpt-4o-mini"),
+    ]
+    return hashlib.blake2b("\x1f".join(parts).encode("utf-8"), digest_size=16).hexdigest()
+
+
+class _Flight:
+    __slots__ = ("done", "result")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+
+
+class ReplyCache:
+    def __init__(self, max_entries=512, ttl=3600.0, path=None, wait_timeout=60.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.wait_timeout = wait_timeout
+        self._entries = OrderedDict()   # key -> (created, reply)
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "coalesced": 0, "disk_hits": 0, "errors": 0, "wait_timeouts": 0}
+
+        self._disk = None
+        if path:
+            self._disk = sqlite3.connect(path, check_same_thread=False)
+            self._disk.execute(
+                "create table if not exists replies (key text primary key, reply text, created real)"
+            )
+            self._disk.commit()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _expired(self, created, now):
+        return self.ttl is not None and now - created > self.ttl
+
+    def _lookup(self, key, now):
+        # caller holds the lock
+        entry = self._entries.get(key)
+        if entry is not None:
+            if not self._expired(entry[0], now):
+                self._entries.move_to_end(key)
+                return entry[1]
+            del self._entries[key]
+
+        if self._disk is not None:
+            row = self._disk.execute("select reply, created from replies where key = ?", (key,)).fetchone()
+            if row and not self._expired(row[1], now):
+                self.stats["disk_hits"] += 1
+                self._remember(key, row[0], row[1])
+                return row[0]
+        return None
+
+    def _remember(self, key, reply, created):
+        self._entries[key] = (created, reply)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get(self, key):
+        with self._lock:
+            reply = self._lookup(key, time.time())
+            self.stats["hits" if reply is not None else "misses"] += 1
+            return reply
+
+    def put(self, key, reply):
+        if reply is None or reply.startswith(ERROR_PREFIX):
+            return
+        now = time.time()
+        with self._lock:
+            self._remember(key, reply, now)
+            if self._disk is not None:
+                try:
+                    self._disk.execute(
+                        "insert or replace into replies (key, reply, created) values (?, ?, ?)",
+                        (key, reply, now),
+                    )
+                    self._disk.commit()
+                except Exception as e:
+                    print("Reply cache ERROR:", e)
+
+    def _begin(self, key):
+        """
+        (reply, flight, leader): the cached reply, or the in-flight call for
+        `key` and whether this caller has to make it.
+        """
+        with self._lock:
+            reply = self._lookup(key, time.time())
+            if reply is not None:
+                self.stats["hits"] += 1
+                return reply, None, False
+            flight = self._inflight.get(key)
+            if flight is not None:
+                self.stats["coalesced"] += 1
+                return None, flight, False
+            self.stats["misses"] += 1
+            flight = self._inflight[key] = _Flight()
+            return None, flight, True
+
+    def _wait(self, flight):
+        """The leader's result, or None if it timed out or failed."""
+        if not flight.done.wait(self.wait_timeout):
+            with self._lock:
+                self.stats["wait_timeouts"] += 1
+            return None
+        return flight.result
+
+    def _store(self, key, reply, failed=False):
+        # count failures, cache everything else
+        if failed or reply is None or reply.startswith(ERROR_PREFIX):
+            self.stats["errors"] += 1
+        else:
+            self.put(key, reply)
+
+    def _land(self, key, flight):
+        # leader done (or gone): release the key and wake the waiters
+        with self._lock:
+            self._inflight.pop(key, None)
+        flight.done.set()
+
+    def get_or_compute(self, key, compute):
+        """
+        Cached reply for `key`, else compute() once — concurrent callers
+        with the same key share that single call.
+        """
+        reply, flight, leader = self._begin(key)
+        if reply is not None:
+            return reply
+
+        if not leader:
+            reply = self._wait(flight)
+            if reply is None:
+                # leader hung or failed: make the call directly
+                reply = compute()
+                self._store(key, reply)
+            return reply
+
+        try:
+            flight.result = compute()
+            self._store(key, flight.result)
+            return flight.result
+        finally:
+            self._land(key, flight)
+
+    def stream_through(self, key, stream):
+        """
+        Generator form of get_or_compute for streamed replies: a cached reply
+        is yielded in one piece; otherwise the first caller streams stream()'s
+        chunks as they arrive and caches the joined reply, while concurrent
+        callers with the same key wait and then yield that reply whole.
+        If the leader stops early (e.g. its page was rerun), a waiting caller
+        takes over and streams the reply itself; if it takes longer than
+        wait_timeout, the waiter streams its own reply directly.
+        """
+        reply, flight, leader = self._begin(key)
+        if reply is not None:
+            yield reply
+            return
+
+        if not leader:
+            if flight.done.wait(self.wait_timeout):
+                if flight.result is None:
+                    yield from self.stream_through(key, stream)
+                else:
+                    yield flight.result
+                return
+            with self._lock:
+                self.stats["wait_timeouts"] += 1
+            parts = []
+            for chunk in stream():
+                parts.append(chunk)
+                yield chunk
+            self._store(key, "".join(parts), any(p.startswith(ERROR_PREFIX) for p in parts))
+            return
+
+        try:
+            parts = []
+            for chunk in stream():
+                parts.append(chunk)
+                yield chunk
+            flight.result = "".join(parts)
+            self._store(key, flight.result, any(p.startswith(ERROR_PREFIX) for p in parts))
+        finally:
+            self._land(key, flight)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self._disk is not None:
+                self._disk.execute("delete from replies")
+                self._disk.commit()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_reply_cache():
+    """
+    Process-wide ReplyCache. Set EMOLENS_REPLY_CACHE to a file path to keep
+    replies on disk, EMOLENS_REPLY_TTL to change the TTL and
+    EMOLENS_REPLY_WAIT how long a duplicate request waits (seconds).
+    """
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ReplyCache(
+                    ttl=float(os.getenv("EMOLENS_REPLY_TTL", "3600")),
+                    path=os.getenv("EMOLENS_REPLY_CACHE") or None,
+                    wait_timeout=float(os.getenv("EMOLENS_REPLY_WAIT", "60")),
+                )
+    return _cache
@@ -1,6 +1,10 @@
 # assistant_engine/generator.py
 import os
+import asyncio
+import weakref
+import threading
 from assistant_engine.policy import pick_style, TEACHING_STYLES
+from assistant_engine.cache import reply_key, get_reply_cache
 
 def build_prompt(user_query, emotion_state, brain_state):
     style_key = pick_style(
@@ -34,42 +38,173 @@ STUDENT QUESTION:
 {user_query}
 """
 
+MOCK_REPLY = (
+    "[Local Mock Response]\n\n"
+    "1) Explanation: Here's the concept simplified.\n"
+    "2) Encouragement: You're doing great — keep going!\n"
+    "3) Next step: Try a tiny example to reinforce this.\n"
+)
+
+# ---------------------------------------------------------
+# Shared client
+# - one OpenAI client (and its HTTP connection pool) per process
+# - request timeout: OPENAI_TIMEOUT seconds
+# - at most EMOLENS_LLM_CONCURRENCY requests in flight (per event loop
+#   for the async client)
+# ---------------------------------------------------------
+LLM_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "20"))
+LLM_CONCURRENCY = int(os.getenv("EMOLENS_LLM_CONCURRENCY", "4"))
+_llm_slots = threading.BoundedSemaphore(LLM_CONCURRENCY)
+# asyncio semaphores belong to one event loop, so keep one per loop
+_async_slots = weakref.WeakKeyDictionary()
+_client_lock = threading.Lock()
+_client = None
+_async_client = None
+
+
+def get_client():
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                from openai import OpenAI
+                _client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"), timeout=LLM_TIMEOUT, max_retries=1)
+    return _client
+
+
+def get_async_client():
+    global _async_client
+    if _async_client is None:
+        with _client_lock:
+            if _async_client is None:
+                from openai import AsyncOpenAI
+                _async_client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"), timeout=LLM_TIMEOUT, max_retries=1)
+    return _async_client
+
+
+def _get_async_slots():
+    loop = asyncio.get_running_loop()
+    slots = _async_slots.get(loop)
+    if slots is None:
+        slots = _async_slots[loop] = asyncio.Semaphore(LLM_CONCURRENCY)
+    return slots
+
+
+def _completion_args(prompt, stream=False):
+    return dict(
+        model=os.getenv("OPENAI_MODEL", "gpt-4o-mini"),
+        messages=[{"role": "user", "content": prompt}],
+        max_tokens=250,
+        temperature=0.5,
+        stream=stream,
+    )
+
+
+def _mock_tokens(text):
+    # word-sized chunks so the UI streams the mock like a real reply
+    for i, word in enumerate(text.split(" ")):
+        yield word if i == 0 else " " + word
+
+
 def call_llm(prompt):
     """
     Uses ONLY the new OpenAI Python SDK style.
     If OPENAI_API_KEY is missing, returns a mock response.
     """
+    if not os.getenv("OPENAI_API_KEY"):
+        return MOCK_REPLY
 
-    api_key = os.getenv("OPENAI_API_KEY")
-    model_name = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
-
-    if not api_key:
-        return (
-            "[Local Mock Response]\n\n"
-            "1) Explanation: Here's the concept simplified.\n"
-            "2) Encouragement: You're doing great — keep going!\n"
-            "3) Next step: Try a tiny example to reinforce this.\n"
-        )
-
+    if not _llm_slots.acquire(timeout=LLM_TIMEOUT):
+        return "[LLM ERROR] too many concurrent requests"
     try:
-        from openai import OpenAI
-        client = OpenAI(api_key=api_key)
-
-        response = client.chat.completions.create(
-            model=model_name,
-            messages=[{"role": "user", "content": prompt}],
-            max_tokens=250,
-            temperature=0.5
-        )
+        response = get_client().chat.completions.create(**_completion_args(prompt))
 
         # NEW SDK: message content is an attribute, NOT a dict
         return response.choices[0].message.content
 
     except Exception as e:
         return f"[LLM ERROR] {e}"
+    finally:
+        _llm_slots.release()
+
+
+def stream_llm(prompt):
+    """
+    Like call_llm, but yields the reply in chunks as they arrive.
+    Errors are yielded as a final "[LLM ERROR] ..." chunk.
+    """
+    if not os.getenv("OPENAI_API_KEY"):
+        yield from _mock_tokens(MOCK_REPLY)
+        return
+
+    if not _llm_slots.acquire(timeout=LLM_TIMEOUT):
+        yield "[LLM ERROR] too many concurrent requests"
+        return
+    try:
+        for chunk in get_client().chat.completions.create(**_completion_args(prompt, stream=True)):
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    except Exception as e:
+        yield f"[LLM ERROR] {e}"
+    finally:
+        _llm_slots.release()
+
+
+async def astream_llm(prompt):
+    """Async variant of stream_llm on the shared AsyncOpenAI client."""
+    if not os.getenv("OPENAI_API_KEY"):
+        for token in _mock_tokens(MOCK_REPLY):
+            yield token
+        return
+
+    slots = _get_async_slots()
+    try:
+        await asyncio.wait_for(slots.acquire(), LLM_TIMEOUT)
+    except asyncio.TimeoutError:
+        yield "[LLM ERROR] too many concurrent requests"
+        return
+    try:
+        stream = await get_async_client().chat.completions.create(**_completion_args(prompt, stream=True))
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    except Exception as e:
+        yield f"[LLM ERROR] {e}"
+    finally:
+        slots.release()
 
 
-def generate_teaching_reply(user_query, emotion_state, brain_state):
+def generate_teaching_reply(user_query, emotion_state, brain_state, llm=None, cache=None, use_cache=True):
+    """
+    llm: callable prompt -> reply (default: call_llm)
+    cache: ReplyCache to use (default: the shared one); use_cache=False bypasses it
+    """
+    llm = llm or call_llm
     prompt = build_prompt(user_query, emotion_state, brain_state)
-    return call_llm(prompt)
+    if not use_cache:
+        return llm(prompt)
+
+    if cache is None:
+        cache = get_reply_cache()
+    key = reply_key(user_query, emotion_state, brain_state)
+    return cache.get_or_compute(key, lambda: llm(prompt))
+
 
+def stream_teaching_reply(user_query, emotion_state, brain_state, llm_stream=None, cache=None, use_cache=True):
+    """
+    Generator version of generate_teaching_reply: yields reply chunks as
+    they arrive. A cached reply is yielded in one piece; a completed stream
+    is stored in the cache (error replies are not). Concurrent identical
+    requests share one stream: the others wait and get the finished reply.
+    llm_stream: callable prompt -> iterable of chunks (default: stream_llm)
+    """
+    llm_stream = llm_stream or stream_llm
+    prompt = build_prompt(user_query, emotion_state, brain_state)
+    if not use_cache:
+        yield from llm_stream(prompt)
+        return
+
+    if cache is None:
+        cache = get_reply_cache()
+    key = reply_key(user_query, emotion_state, brain_state)
+    yield from cache.stream_through(key, lambda: llm_stream(prompt))
@@ -1,9 +1,33 @@
 from multimodal_brain.rules import THRESHOLDS
 from multimodal_brain.utils import EmotionHistory
+from multimodal_brain.state_store import BrainStateStore
 
-history = EmotionHistory(maxlen=10)
+# events kept per history; window statistics are O(1), so longer windows are cheap.
+# The prediction uses the least-squares slope over this window: longer windows
+# smooth more but react later to a sudden drop (thresholds are per event).
+HISTORY_WINDOW = 30
 
-def analyze_state(ev):
+SUPPORT_EMOTIONS = ("anger", "fear", "sadness")
+
+MICRO_PROMPTS = {
+    "slow_down": "I notice this might be getting tricky. Want a simpler version?",
+    "supportive_recap": "Let’s take this step-by-step. I’ve got you.",
+    "advance": "You're doing great—want to try something harder?",
+    "re_engage": "Should I show an example or switch style?",
+    "continue": "Let's go ahead at this pace.",
+}
+
+# shared history for callers that do not pass a session id
+history = EmotionHistory(maxlen=HISTORY_WINDOW)
+
+# one bounded history per session for everything else
+state_store = BrainStateStore(maxlen=HISTORY_WINDOW)
+
+def analyze_state(ev, session_id=None):
+    """
+    Map a fused EmotionVector to engagement / load / prediction / action.
+    With a session_id, the valence / arousal trends use that session's own history.
+    """
     if not ev:
         return {
             "engagement_level": "none",
@@ -13,6 +37,12 @@ def analyze_state(ev):
             "micro_prompt": "Start whenever you're ready!"
         }
 
+    if session_id is None:
+        return _analyze(ev, history)
+    with state_store.history(session_id) as hist:
+        return _analyze(ev, hist)
+
+def _analyze(ev, history):
     history.add(ev.valence, ev.arousal)
 
     v = ev.valence
@@ -28,20 +58,21 @@ def analyze_state(ev):
         engagement = "medium"
 
     # 2. COGNITIVE LOAD
-    if a < 0.25:
+    if a < THRESHOLDS["low_load_arousal"]:
         load = "low"
-    elif a < 0.55:
+    elif a < THRESHOLDS["high_load_arousal"]:
         load = "medium"
     else:
         load = "high"
 
-    # 3. Momentum / future prediction
-    momentum_val = history.momentum()
-    arousal_trend = history.arousal_trend()
+    # 3. Momentum / future prediction: least-squares slope per event over
+    # the whole window, not just its first and last values
+    momentum_val = history.valence_slope()
+    arousal_trend = history.arousal_slope()
 
-    if momentum_val < -0.03 and arousal_trend > 0.03:
+    if momentum_val < THRESHOLDS["frustration_momentum"] and arousal_trend > THRESHOLDS["frustration_arousal_trend"]:
         predicted = "incoming_frustration"
-    elif momentum_val > 0.04:
+    elif momentum_val > THRESHOLDS["improving_momentum"]:
         predicted = "improving"
     else:
         predicted = "stable"
@@ -49,19 +80,15 @@ def analyze_state(ev):
     # 4. Teaching action
     if predicted == "incoming_frustration":
         action = "slow_down"
-        micro = "I notice this might be getting tricky. Want a simpler version?"
-    elif emo in ("anger", "fear", "sadness"):
+    elif emo in SUPPORT_EMOTIONS:
         action = "supportive_recap"
-        micro = "Let’s take this step-by-step. I’ve got you."
     elif engagement == "high":
         action = "advance"
-        micro = "You're doing great—want to try something harder?"
     elif engagement == "low":
         action = "re_engage"
-        micro = "Should I show an example or switch style?"
     else:
         action = "continue"
-        micro = "Let's go ahead at this pace."
+    micro = MICRO_PROMPTS[action]
 
     return {
         "engagement_level": engagement,
@@ -0,0 +1,85 @@
+import numpy as np
+from multimodal_brain.rules import THRESHOLDS
+
+
+def rolling_mean(x, window):
+    """Trailing mean over `window` events (shorter at the start), O(n)."""
+    x = np.asarray(x, dtype=np.float64)
+    if window <= 1 or len(x) == 0:
+        return x
+    c = np.concatenate(([0.0], np.cumsum(x)))
+    idx = np.arange(1, len(x) + 1)
+    lo = np.maximum(0, idx - window)
+    return (c[idx] - c[lo]) / (idx - lo)
+
+
+def detect_episodes(valence, arousal, timestamps=None, window=3, hysteresis=None, thresholds=None, min_events=1):
+    """
+    Frustration episodes over a whole session, in linear time.
+
+    valence / arousal are smoothed with a trailing window, then:
+    - an episode starts where valence <= frustration_valence and
+      arousal >= frustration_arousal,
+    - it continues while both stay within `hysteresis` of those thresholds
+      (default: THRESHOLDS["confusion_window"]), so a signal hovering at the
+      boundary yields one episode instead of many spikes.
+
+    Returns a list of dicts: start, end (event indices, inclusive), events,
+    start_ts, end_ts (None without timestamps), duration (seconds if
+    timestamps are given, else events),
+    severity (mean distance past the thresholds) and peak (its maximum).
+    """
+    th = dict(THRESHOLDS)
+    if thresholds:
+        th.update(thresholds)
+    fv, fa = th["frustration_valence"], th["frustration_arousal"]
+    h = th["confusion_window"] if hysteresis is None else hysteresis
+
+    v = rolling_mean(valence, window)
+    a = rolling_mean(arousal, window)
+    n = len(v)
+    if n == 0:
+        return []
+
+    enter = (v <= fv) & (a >= fa)
+    stay = (v <= fv + h) & (a >= fa - h)
+
+    # active = inside a run of `stay` that has had an `enter` since the run began
+    idx = np.arange(n)
+    last_enter = np.maximum.accumulate(np.where(enter, idx, -1))
+    last_break = np.maximum.accumulate(np.where(~stay, idx, -1))
+    active = stay & (last_enter > last_break)
+
+    edges = np.diff(np.concatenate(([0], active.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1) - 1
+    if len(starts) == 0:
+        return []
+
+    # distance past the thresholds; zeroed outside episodes so reduceat
+    # over [start_i, start_i+1) only sums the episode itself
+    depth = np.where(active, np.maximum(fv - v, 0.0) + np.maximum(a - fa, 0.0), 0.0)
+    lengths = ends - starts + 1
+    severity = np.add.reduceat(depth, starts) / lengths
+    peak = np.maximum.reduceat(depth, starts)
+
+    if timestamps is not None:
+        ts = np.asarray(timestamps, dtype="datetime64[ns]")
+        start_ts, end_ts = ts[starts], ts[ends]
+        duration = (end_ts - start_ts) / np.timedelta64(1, "s")
+    else:
+        duration = lengths.astype(np.float64)
+
+    out = []
+    for i in np.flatnonzero(lengths >= min_events):
+        out.append({
+            "start": int(starts[i]),
+            "end": int(ends[i]),
+            "events": int(lengths[i]),
+            "start_ts": start_ts[i] if timestamps is not None else None,
+            "end_ts": end_ts[i] if timestamps is not None else None,
+            "duration": float(duration[i]),
+            "severity": float(severity[i]),
+            "peak": float(peak[i]),
+        })
+    return out
@@ -0,0 +1,122 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from multimodal_brain.rules import THRESHOLDS
+from multimodal_brain.brain import HISTORY_WINDOW, SUPPORT_EMOTIONS, MICRO_PROMPTS
+
+
+def window_slope(x, window=HISTORY_WINDOW):
+    """
+    EmotionHistory.valence_slope() / arousal_slope() after every event, for a
+    whole series at once: the least-squares slope per event over
+    x[max(0, i - window + 1) .. i], and 0 while fewer than 2 values are held.
+    Uses cumulative sums, so it matches the live ring buffers up to float rounding.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    idx = np.arange(len(x))
+    start = np.maximum(0, idx - window + 1)
+    n = (idx - start + 1).astype(np.float64)
+
+    cx = np.concatenate(([0.0], np.cumsum(x)))
+    ctx = np.concatenate(([0.0], np.cumsum(idx * x)))
+    sx = cx[idx + 1] - cx[start]
+    sux = (ctx[idx + 1] - ctx[start]) - start * sx     # Σ u·x with u = 0..n-1
+    su = n * (n - 1) / 2.0
+    suu = (n - 1) * n * (2 * n - 1) / 6.0
+
+    denom = n * suu - su * su
+    out = np.zeros(len(x))
+    ok = n >= 2
+    out[ok] = (n[ok] * sux[ok] - su[ok] * sx[ok]) / denom[ok]
+    return out
+
+
+def replay_session(valence, arousal, emotion=None, thresholds=None, window=HISTORY_WINDOW):
+    """
+    Re-run analyze_state() over one recorded session, starting from an empty
+    history, with every rule evaluated as a vectorized threshold test.
+
+    valence / arousal: per-event fused values, emotion: fused labels (optional)
+    thresholds: overrides merged into THRESHOLDS (for tuning)
+
+    Returns a dict of arrays: engagement_level, cognitive_load,
+    predicted_state, recommended_action, micro_prompt, momentum, arousal_trend
+    (the valence / arousal slopes the prediction was made from).
+    """
+    th = dict(THRESHOLDS)
+    if thresholds:
+        th.update(thresholds)
+
+    v = np.asarray(valence, dtype=np.float64)
+    a = np.asarray(arousal, dtype=np.float64)
+    emo = np.asarray(emotion if emotion is not None else [None] * len(v), dtype=object)
+
+    momentum = window_slope(v, window)
+    trend = window_slope(a, window)
+
+    engagement = np.select(
+        [v > th["high_engagement_valence"], v < th["low_engagement_valence"]],
+        ["high", "low"], default="medium",
+    )
+    load = np.select(
+        [a < th["low_load_arousal"], a < th["high_load_arousal"]],
+        ["low", "medium"], default="high",
+    )
+    predicted = np.select(
+        [
+            (momentum < th["frustration_momentum"]) & (trend > th["frustration_arousal_trend"]),
+            momentum > th["improving_momentum"],
+        ],
+        ["incoming_frustration", "improving"], default="stable",
+    )
+    action = np.select(
+        [
+            predicted == "incoming_frustration",
+            np.isin(emo, SUPPORT_EMOTIONS),
+            engagement == "high",
+            engagement == "low",
+        ],
+        ["slow_down", "supportive_recap", "advance", "re_engage"], default="continue",
+    )
+    micro = np.empty(len(v), dtype=object)
+    for key, text in MICRO_PROMPTS.items():
+        micro[action == key] = text
+
+    return {
+        "engagement_level": engagement,
+        "cognitive_load": load,
+        "predicted_state": predicted,
+        "recommended_action": action,
+        "micro_prompt": micro,
+        "momentum": momentum,
+        "arousal_trend": trend,
+    }
+
+
+def _replay_one(session, thresholds, window):
+    # top-level so it can run in a worker process
+    return replay_session(
+        session["valence"], session["arousal"], session.get("emotion"),
+        thresholds=thresholds, window=window,
+    )
+
+
+def replay_sessions(sessions, thresholds=None, window=HISTORY_WINDOW, max_workers=None):
+    """
+    Replay many sessions. `sessions` maps session_id -> anything indexable by
+    "valence", "arousal" and optionally "emotion" (a dict of arrays or an
+    archive DataFrame). Sessions are spread over a process pool.
+    Returns {session_id: replay_session() output}.
+    """
+    ids = list(sessions)
+    if len(ids) <= 1 or max_workers == 1:
+        return {sid: _replay_one(sessions[sid], thresholds, window) for sid in ids}
+
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        results = pool.map(
+            _replay_one, [sessions[sid] for sid in ids],
+            [thresholds] * len(ids), [window] * len(ids),
+            chunksize=max(1, len(ids) // 32),
+        )
+        return dict(zip(ids, results))
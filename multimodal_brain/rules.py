@@ -4,4 +4,11 @@ THRESHOLDS = {
     "low_engagement_valence": -0.2,
     "high_engagement_valence": 0.6,
     "confusion_window": 0.15,
+    # cognitive load from arousal
+    "low_load_arousal": 0.25,
+    "high_load_arousal": 0.55,
+    # prediction from the per-event valence / arousal slope over the history
+    "frustration_momentum": -0.03,
+    "frustration_arousal_trend": 0.03,
+    "improving_momentum": 0.04,
 }
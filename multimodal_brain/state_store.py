@@ -0,0 +1,56 @@
+import time
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from multimodal_brain.utils import EmotionHistory
+
+
+class BrainStateStore:
+    """
+    Per-session EmotionHistory objects for analyze_state().
+
+    Sessions are spread over `stripes` independently locked LRU maps, so
+    threads analyzing different students rarely contend on the same lock.
+    Each stripe holds at most max_sessions / stripes histories; the least
+    recently used ones are evicted first, and any session idle for longer
+    than idle_ttl seconds is dropped on the next access to its stripe.
+    """
+    def __init__(self, maxlen=10, max_sessions=4096, idle_ttl=1800.0, stripes=16):
+        self.maxlen = maxlen
+        self.idle_ttl = idle_ttl
+        self._per_stripe = max(1, -(-max_sessions // stripes))
+        self._stripes = [(threading.Lock(), OrderedDict()) for _ in range(stripes)]
+
+    def _stripe(self, session_id):
+        return self._stripes[hash(session_id) % len(self._stripes)]
+
+    def _evict(self, entries, now):
+        # LRU order: the oldest entries are at the front
+        while entries:
+            sid, (_, last_used) = next(iter(entries.items()))
+            if len(entries) > self._per_stripe or now - last_used > self.idle_ttl:
+                entries.popitem(last=False)
+            else:
+                break
+
+    @contextmanager
+    def history(self, session_id):
+        """Hold the session's history (creating it if needed) under its stripe lock."""
+        lock, entries = self._stripe(session_id)
+        with lock:
+            now = time.monotonic()
+            entry = entries.get(session_id)
+            hist = entry[0] if entry else EmotionHistory(maxlen=self.maxlen)
+            entries[session_id] = (hist, now)
+            entries.move_to_end(session_id)
+            self._evict(entries, now)
+            yield hist
+
+    def drop(self, session_id):
+        lock, entries = self._stripe(session_id)
+        with lock:
+            entries.pop(session_id, None)
+
+    def __len__(self):
+        return sum(len(entries) for _, entries in self._stripes)
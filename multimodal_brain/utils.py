@@ -1,20 +1,137 @@
-from collections import deque
+import numpy as np
+
+
+class _RunningWindow:
+    """
+    Preallocated NumPy ring buffer over the last `maxlen` values, with running
+    sums (Σx, Σx², Σt·x) updated on append / evict so window statistics are
+    O(1) regardless of the window length. Sums are recomputed from the buffer
+    once per `maxlen` evictions to keep floating-point drift bounded.
+    """
+    def __init__(self, maxlen, ewma_alpha=0.3):
+        self.maxlen = max(1, int(maxlen))
+        self.buf = np.zeros(self.maxlen, dtype=np.float64)
+        self.alpha = ewma_alpha
+        self.head = 0       # slot of the oldest value
+        self.n = 0
+        self.t = 0          # time index of the next value (rebased on resync)
+        self.sx = 0.0
+        self.sxx = 0.0
+        self.stx = 0.0
+        self.ewma = None
+        self._evictions = 0
+
+    def __len__(self):
+        return self.n
+
+    def append(self, x):
+        x = float(x)
+        if self.n == self.maxlen:
+            old = self.buf[self.head]
+            t_old = self.t - self.n
+            self.sx -= old
+            self.sxx -= old * old
+            self.stx -= t_old * old
+            self.head = (self.head + 1) % self.maxlen
+            self.n -= 1
+            self._evictions += 1
+
+        self.buf[(self.head + self.n) % self.maxlen] = x
+        self.n += 1
+        self.sx += x
+        self.sxx += x * x
+        self.stx += self.t * x
+        self.t += 1
+        self.ewma = x if self.ewma is None else self.alpha * x + (1.0 - self.alpha) * self.ewma
+
+        if self._evictions >= self.maxlen:
+            self._resync()
+
+    def _resync(self):
+        vals = self.values()
+        idx = np.arange(self.n, dtype=np.float64)
+        self.sx = float(vals.sum())
+        self.sxx = float(np.dot(vals, vals))
+        self.stx = float(np.dot(idx, vals))
+        self.t = self.n
+        self._evictions = 0
+
+    def values(self):
+        """Window contents, oldest first (a copy)."""
+        return np.roll(self.buf, -self.head)[:self.n]
+
+    def first(self):
+        return float(self.buf[self.head])
+
+    def last(self):
+        return float(self.buf[(self.head + self.n - 1) % self.maxlen])
+
+    def mean(self):
+        return self.sx / self.n if self.n else 0.0
+
+    def variance(self):
+        if self.n < 2:
+            return 0.0
+        m = self.sx / self.n
+        return max(0.0, self.sxx / self.n - m * m)
+
+    def slope(self):
+        """Least-squares slope per event over the window."""
+        n = self.n
+        if n < 2:
+            return 0.0
+        t0 = self.t - n
+        sux = self.stx - t0 * self.sx            # Σ u·x with u = 0..n-1
+        su = n * (n - 1) / 2.0
+        suu = (n - 1) * n * (2 * n - 1) / 6.0
+        return (n * sux - su * self.sx) / (n * suu - su * su)
+
 
 class EmotionHistory:
-    def __init__(self, maxlen=10):
-        self.valences = deque(maxlen=maxlen)
-        self.arousals = deque(maxlen=maxlen)
+    def __init__(self, maxlen=10, ewma_alpha=0.3):
+        self._v = _RunningWindow(maxlen, ewma_alpha)
+        self._a = _RunningWindow(maxlen, ewma_alpha)
+
+    @property
+    def valences(self):
+        return self._v.values()
+
+    @property
+    def arousals(self):
+        return self._a.values()
+
+    def __len__(self):
+        return len(self._v)
 
     def add(self, v, a):
-        self.valences.append(v)
-        self.arousals.append(a)
+        self._v.append(v)
+        self._a.append(a)
 
     def momentum(self):
-        if len(self.valences) < 2:
+        if len(self._v) < 2:
             return 0
-        return (self.valences[-1] - self.valences[0]) / len(self.valences)
+        return (self._v.last() - self._v.first()) / len(self._v)
 
     def arousal_trend(self):
-        if len(self.arousals) < 2:
+        if len(self._a) < 2:
             return 0
-        return (self.arousals[-1] - self.arousals[0]) / len(self.arousals)
+        return (self._a.last() - self._a.first()) / len(self._a)
+
+    # richer trend estimators, all O(1)
+    def valence_slope(self):
+        return self._v.slope()
+
+    def arousal_slope(self):
+        return self._a.slope()
+
+    def valence_variance(self):
+        return self._v.variance()
+
+    def arousal_variance(self):
+        return self._a.variance()
+
+    def valence_ewma(self):
+        return self._v.ewma if self._v.ewma is not None else 0.0
+
+    def arousal_ewma(self):
+        return self._a.ewma if self._a.ewma is not None else 0.0
@@ -1,6 +1,10 @@
 # multimodal_emotion/audio_emotion.py
 # Lightweight, robust audio emotion detector using signal features (librosa)
 import io
+import struct
+import threading
+from collections import Counter
+from dataclasses import dataclass, field
 import numpy as np
 import librosa
 from multimodal_emotion.types import Modality
@@ -13,14 +17,127 @@ VALENCE_MAP = {
     "sad": -0.6, "fearful": -0.7, "angry": -0.85, "disgust": -0.8
 }
 
-def _rms_energy(y):
-    return float(np.mean(librosa.feature.rms(y=y)))
+# framing shared by every frame-level feature (librosa defaults)
+N_FFT = 2048
+HOP_LENGTH = 512
 
-def _zcr(y):
-    return float(np.mean(librosa.feature.zero_crossing_rate(y)))
+# all analysis runs at this sample rate
+TARGET_SR = 16000
 
-def _spectral_centroid(y, sr):
-    return float(np.mean(librosa.feature.spectral_centroid(y=y, sr=sr)))
+@dataclass
+class AudioFeatures:
+    """Clip-level summary consumed by the heuristic emotion mapping."""
+    sr: int
+    rms: float
+    zcr: float
+    centroid: float
+    pitch: float
+    pitch_conf: float
+    mfcc_score: float
+    # voice-activity gating: (start, end) seconds of voiced speech, the
+    # voiced share of the clip, and whether features used voiced frames only
+    segments: list = field(default_factory=list)
+    voiced_ratio: float = 1.0
+    vad: bool = False
+
+def _frame_starts(n, frame_length=N_FFT, hop_length=HOP_LENGTH):
+    # start offsets of centered frames over a signal padded by frame_length // 2 on each side
+    n_frames = 1 + (n + 2 * (frame_length // 2) - frame_length) // hop_length
+    return np.arange(n_frames) * hop_length
+
+def _frame_rms_zcr(y, frame_length=N_FFT, hop_length=HOP_LENGTH):
+    """
+    Per-frame RMS and zero-crossing rate, matching librosa.feature.rms /
+    zero_crossing_rate (centered frames), from one pass of cumulative sums
+    instead of two framed copies of the signal.
+    """
+    pad = frame_length // 2
+    starts = _frame_starts(len(y), frame_length, hop_length)
+
+    # rms: zero padding, mean power per frame
+    energy = np.concatenate(([0.0], np.cumsum(np.square(y, dtype=np.float64))))
+    lo = np.clip(starts - pad, 0, len(y))
+    hi = np.clip(starts - pad + frame_length, 0, len(y))
+    rms = np.sqrt((energy[hi] - energy[lo]) / frame_length)
+
+    # zcr: edge padding adds no crossings; the first sample of a frame is never counted
+    s = np.signbit(np.where(np.abs(y) <= 1e-10, 0.0, y))
+    crossings = np.concatenate(([0, 0], np.cumsum(s[1:] != s[:-1])))
+    lo = np.clip(starts - pad + 1, 0, len(y))
+    hi = np.clip(starts - pad + frame_length, 0, len(y))
+    zcr = (crossings[hi] - crossings[lo]) / frame_length
+
+    return rms, zcr
+
+# --------------------------------------------
+# Voice activity detection
+# --------------------------------------------
+# voiced runs shorter than this are dropped (clicks, breaths)
+VAD_MIN_SECONDS = 0.1
+
+def _voiced_frames(rms, zcr, energy_ratio=0.1, min_rms=0.005, max_zcr=0.3, hangover=3):
+    """
+    Boolean voiced mask over frames: energy above an adaptive threshold
+    between the clip's noise floor and its loud frames, and a ZCR below
+    what broadband noise produces. Short gaps are bridged by keeping
+    `hangover` frames on each side of voiced frames.
+    """
+    if len(rms) == 0:
+        return np.zeros(0, dtype=bool)
+    floor, peak = np.percentile(rms, (10, 95))
+    threshold = max(min_rms, floor + energy_ratio * (peak - floor))
+    voiced = (rms > threshold) & (zcr < max_zcr)
+    if hangover > 0:
+        voiced = np.convolve(voiced, np.ones(2 * hangover + 1), mode="same") > 0
+    return voiced
+
+def _segments_from_mask(voiced, n_samples, frame_length=N_FFT, hop_length=HOP_LENGTH, min_frames=1):
+    """
+    Voiced runs of at least min_frames frames, as ((k, 2) array of [start, end)
+    sample bounds, frame mask of the runs kept). Frames are centred on
+    i * hop_length, so a run spans from its first frame's left edge to its
+    last frame's right edge, clipped to the signal; runs whose spans
+    overlap are merged.
+    """
+    edges = np.diff(np.concatenate(([0], voiced.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    keep = (ends - starts) >= min_frames
+    starts, ends = starts[keep], ends[keep]
+
+    kept = np.zeros(len(voiced), dtype=bool)
+    for s, e in zip(starts, ends):
+        kept[s:e] = True
+
+    half = frame_length // 2
+    lo = np.clip(starts * hop_length - half, 0, n_samples)
+    hi = np.clip((ends - 1) * hop_length - half + frame_length, 0, n_samples)
+    bounds = []
+    for s, e in zip(lo.tolist(), hi.tolist()):
+        if bounds and s <= bounds[-1][1]:
+            bounds[-1][1] = max(bounds[-1][1], e)
+        else:
+            bounds.append([s, e])
+    return np.array(bounds, dtype=np.int64).reshape(-1, 2), kept
+
+def _vad(rms, zcr, n_samples, sr, frame_length=N_FFT, hop_length=HOP_LENGTH,
+         energy_ratio=0.1, min_rms=0.005, max_zcr=0.3, hangover=3, min_seconds=VAD_MIN_SECONDS):
+    """Sample bounds and frame mask of voiced runs at least min_seconds long."""
+    voiced = _voiced_frames(rms, zcr, energy_ratio, min_rms, max_zcr, hangover)
+    min_frames = max(1, int(np.ceil(min_seconds * sr / hop_length)))
+    return _segments_from_mask(voiced, n_samples, frame_length, hop_length, min_frames)
+
+def detect_voiced_segments(y, sr, frame_length=N_FFT, hop_length=HOP_LENGTH,
+                           energy_ratio=0.1, min_rms=0.005, max_zcr=0.3,
+                           hangover=3, min_seconds=VAD_MIN_SECONDS):
+    """
+    Energy / ZCR voice activity detection.
+    Input: mono signal, sample rate. Output: list of (start, end) seconds.
+    """
+    rms, zcr = _frame_rms_zcr(y, frame_length, hop_length)
+    bounds, _ = _vad(rms, zcr, len(y), sr, frame_length, hop_length,
+                     energy_ratio, min_rms, max_zcr, hangover, min_seconds)
+    return [(s / sr, e / sr) for s, e in bounds.tolist()]
 
 def _pitch_confidence(y, sr):
     # use short pitch estimation; return (pitch, confidence)
@@ -34,64 +151,322 @@ def _pitch_confidence(y, sr):
     except Exception:
         return 0.0, 0.0
 
-def analyze_audio(audio_bytes):
+def extract_features(y, sr, vad=False, min_voiced_seconds=0.25):
     """
-    Input: raw audio bytes (wav/mp3). Output: Modality
+    Compute every clip feature from a single STFT.
+    The magnitude spectrogram feeds the spectral centroid and (squared) the
+    mel / MFCC pipeline; RMS and ZCR share the same frame grid.
+
+    With vad=True, silent frames are dropped first: energy statistics use
+    voiced frames only, and the STFT / MFCC / pitch tracking run on the
+    voiced samples alone (segments as detect_voiced_segments finds them).
+    Clips with less than min_voiced_seconds of voiced audio fall back to the
+    full clip. Off by default, so scores match the ungated analyzer.
+    """
+    frame_rms, frame_zcr = _frame_rms_zcr(y)     # energy, voice activity / noisiness
+    segments, voiced_ratio, gated = [], 1.0, False
+
+    if vad and len(frame_rms):
+        bounds, voiced = _vad(frame_rms, frame_zcr, len(y), sr)
+        n_voiced = int(np.sum(bounds[:, 1] - bounds[:, 0])) if len(bounds) else 0
+        segments = [(s / sr, e / sr) for s, e in bounds.tolist()]
+        voiced_ratio = n_voiced / len(y) if len(y) else 0.0
+        if n_voiced >= max(N_FFT, int(min_voiced_seconds * sr)):
+            gated = True
+            frame_rms, frame_zcr = frame_rms[voiced], frame_zcr[voiced]
+            if n_voiced < len(y):
+                y = np.concatenate([y[s:e] for s, e in bounds])
+
+    rms, zcr = float(np.mean(frame_rms)), float(np.mean(frame_zcr))
+
+    S = np.abs(librosa.stft(y, n_fft=N_FFT, hop_length=HOP_LENGTH))
+    centroid = float(np.mean(librosa.feature.spectral_centroid(S=S, sr=sr)))
+
+    # MFCC summary
+    mel = librosa.feature.melspectrogram(S=S ** 2, sr=sr)
+    mfcc = librosa.feature.mfcc(S=librosa.power_to_db(mel), sr=sr, n_mfcc=13)
+    mfcc_mean = np.mean(mfcc, axis=1)
+    mfcc_std = np.std(mfcc, axis=1)
+    mfcc_score = float(np.mean(np.abs(mfcc_mean)) / (np.mean(np.abs(mfcc_std)) + 1e-6))
+
+    pitch, pitch_conf = _pitch_confidence(y, sr)
+
+    return AudioFeatures(sr=sr, rms=rms, zcr=zcr, centroid=centroid,
+                         pitch=pitch, pitch_conf=pitch_conf, mfcc_score=mfcc_score,
+                         segments=segments, voiced_ratio=voiced_ratio, vad=gated)
+
+def modality_from_features(f):
+    """Heuristic mapping from AudioFeatures to a Modality."""
+    sr = f.sr
+    rms = f.rms
+    centroid = f.centroid
+    pitch_conf = f.pitch_conf
+    mfcc_score = f.mfcc_score
+
+    # Heuristic rules to map into emotion signals
+    # energy + high centroid -> excited / angry / surprised
+    excited_signal = min(1.0, rms * 6.0 + (centroid / (sr/2)) * 2.0)
+    calm_signal = max(0.0, 1.0 - excited_signal) * 0.6
+    happy_signal = min(1.0, pitch_conf * 0.9 + mfcc_score * 0.3)
+    sad_signal = max(0.0, 0.6 - rms) * 1.2
+    angry_signal = min(1.0, max(0.0, rms * 4.0 - 0.2))
+    fear_signal = max(0.0, 0.4 - pitch_conf)
+    disgust_signal = 0.05
+    neutral_signal = 0.15
+
+    signals = {
+        "happy": happy_signal,
+        "surprised": excited_signal * 0.65,
+        "calm": calm_signal,
+        "neutral": neutral_signal,
+        "sad": sad_signal,
+        "angry": angry_signal,
+        "fearful": fear_signal,
+        "disgust": disgust_signal
+    }
+
+    # normalize
+    total = sum(signals.values()) + 1e-9
+    for k in signals:
+        signals[k] = float(signals[k] / total)
+
+    emotion = max(signals, key=lambda k: signals[k])
+    raw_conf = float(signals[emotion])
+
+    # smooth confidence with energy/pitch cues
+    confidence = min(0.9999, raw_conf * 0.9 + (rms * 0.4) + (pitch_conf * 0.3))
+
+    valence = VALENCE_MAP.get(emotion, 0.0)
+    arousal = min(1.0, 0.2 + confidence * 0.9)
+
+    return Modality(emotion=emotion, confidence=confidence, valence=valence, arousal=arousal)
+
+# --------------------------------------------
+# Decode layer
+# --------------------------------------------
+# which path each upload took: "wav_fast", "wav_resampled" or "librosa"
+_decode_counts = Counter()
+_decode_lock = threading.Lock()
+
+_WAV_PCM = 1
+_WAV_FLOAT = 3
+_WAV_EXTENSIBLE = 0xFFFE
+
+def decode_stats():
+    """Snapshot of the decode-path counters."""
+    with _decode_lock:
+        return dict(_decode_counts)
+
+def _count(path):
+    with _decode_lock:
+        _decode_counts[path] += 1
+
+def _parse_wav(buf):
+    """
+    Return (fmt, channels, sr, bits, data_offset, data_size) for a RIFF/WAVE
+    buffer, or None if it is not a WAV file we can read directly.
+    """
+    if len(buf) < 12 or buf[0:4] != b"RIFF" or buf[8:12] != b"WAVE":
+        return None
+    fmt = None
+    pos = 12
+    while pos + 8 <= len(buf):
+        cid = bytes(buf[pos:pos + 4])
+        size = struct.unpack_from("<I", buf, pos + 4)[0]
+        body = pos + 8
+        if cid == b"fmt " and size >= 16:
+            tag, channels, sr, _, _, bits = struct.unpack_from("<HHIIHH", buf, body)
+            if tag == _WAV_EXTENSIBLE and size >= 26:
+                tag = struct.unpack_from("<H", buf, body + 24)[0]
+            fmt = (tag, channels, sr, bits)
+        elif cid == b"data" and fmt is not None:
+            # streamed WAVs may carry a 0 / oversized length: clamp to what we have
+            size = min(size, len(buf) - body)
+            return fmt + (body, size)
+        pos = body + size + (size & 1)
+    return None
+
+def _decode_wav(buf, header):
+    tag, channels, sr, bits, offset, size = header
+    if channels < 1:
+        return None
+    if tag == _WAV_FLOAT and bits == 32:
+        dtype, scale = "<f4", None
+    elif tag == _WAV_PCM and bits == 16:
+        dtype, scale = "<i2", 1.0 / 32768.0
+    elif tag == _WAV_PCM and bits == 32:
+        dtype, scale = "<i4", 1.0 / 2147483648.0
+    else:
+        return None
+
+    itemsize = np.dtype(dtype).itemsize
+    n = size // (itemsize * channels) * channels
+    # view straight onto the upload buffer; float32 data is never copied
+    pcm = np.frombuffer(buf, dtype=dtype, count=n, offset=offset)
+    if scale is None:
+        y = pcm
+    else:
+        # one unavoidable int -> float32 conversion, scaled in place
+        y = pcm.astype(np.float32)
+        y *= np.float32(scale)
+
+    if channels > 1:
+        y = y.reshape(-1, channels).mean(axis=1, dtype=np.float32)
+    return y, sr
+
+def decode_audio(audio_bytes, sr=TARGET_SR):
+    """
+    Decode uploaded audio to mono float32 at sr.
+    PCM/float WAV is read directly from the buffer and only resampled when its
+    rate differs; anything else goes through librosa.load.
+    """
+    header = _parse_wav(audio_bytes)
+    decoded = _decode_wav(audio_bytes, header) if header else None
+    if decoded is not None:
+        y, native_sr = decoded
+        if native_sr == sr:
+            _count("wav_fast")
+            return y, sr
+        _count("wav_resampled")
+        return librosa.resample(y, orig_sr=native_sr, target_sr=sr), sr
+
+    _count("librosa")
+    return librosa.load(io.BytesIO(audio_bytes), sr=sr, mono=True)
+
+def analyze_audio_detailed(audio_bytes, vad=False):
+    """
+    Input: raw audio bytes (wav/mp3).
+    Output: (Modality, AudioFeatures) — features carry the voiced segments;
+    None on decode / analysis errors.
     """
     try:
-        y, sr = librosa.load(io.BytesIO(audio_bytes), sr=16000, mono=True)
-
-        # core features
-        rms = _rms_energy(y)               # energy
-        zcr = _zcr(y)                      # voice activity / noisiness
-        centroid = _spectral_centroid(y, sr)
-        pitch, pitch_conf = _pitch_confidence(y, sr)
-
-        # MFCC summary
-        mfcc = librosa.feature.mfcc(y=y, sr=sr, n_mfcc=13)
-        mfcc_mean = np.mean(mfcc, axis=1)
-        mfcc_std = np.std(mfcc, axis=1)
-        mfcc_score = float(np.mean(np.abs(mfcc_mean)) / (np.mean(np.abs(mfcc_std)) + 1e-6))
-
-        # Heuristic rules to map into emotion signals
-        # energy + high centroid -> excited / angry / surprised
-        excited_signal = min(1.0, rms * 6.0 + (centroid / (sr/2)) * 2.0)
-        calm_signal = max(0.0, 1.0 - excited_signal) * 0.6
-        happy_signal = min(1.0, pitch_conf * 0.9 + mfcc_score * 0.3)
-        sad_signal = max(0.0, 0.6 - rms) * 1.2
-        angry_signal = min(1.0, max(0.0, rms * 4.0 - 0.2))
-        fear_signal = max(0.0, 0.4 - pitch_conf)
-        disgust_signal = 0.05
-        neutral_signal = 0.15
-
-        signals = {
-            "happy": happy_signal,
-            "surprised": excited_signal * 0.65,
-            "calm": calm_signal,
-            "neutral": neutral_signal,
-            "sad": sad_signal,
-            "angry": angry_signal,
-            "fearful": fear_signal,
-            "disgust": disgust_signal
-        }
-
-        # normalize
-        total = sum(signals.values()) + 1e-9
-        for k in signals:
-            signals[k] = float(signals[k] / total)
-
-        emotion = max(signals, key=lambda k: signals[k])
-        raw_conf = float(signals[emotion])
-
-        # smooth confidence with energy/pitch cues
-        confidence = min(0.9999, raw_conf * 0.9 + (rms * 0.4) + (pitch_conf * 0.3))
-
-        valence = VALENCE_MAP.get(emotion, 0.0)
-        arousal = min(1.0, 0.2 + confidence * 0.9)
-
-        return Modality(emotion=emotion, confidence=confidence, valence=valence, arousal=arousal)
+        y, sr = decode_audio(audio_bytes)
+        features = extract_features(y, sr, vad=vad)
+        return modality_from_features(features), features
 
     except Exception as e:
         print("audio_emotion ERROR:", e)
-        return Modality("neutral", 0.25, 0.0, 0.15)
+        return Modality("neutral", 0.25, 0.0, 0.15), None
+
+def analyze_audio(audio_bytes, vad=False):
+    """
+    Input: raw audio bytes (wav/mp3). Output: Modality
+    """
+    return analyze_audio_detailed(audio_bytes, vad=vad)[0]
+
+
+# --------------------------------------------
+# Streaming / chunked analysis
+# --------------------------------------------
+
+class AudioStreamAnalyzer:
+    """
+    Incremental analyzer for long recordings or live microphone feeds.
+
+    PCM chunks (mono float, TARGET_SR) are copied into one preallocated window
+    buffer. Every full window is summarized with extract_features and folded
+    into exponentially decayed accumulators, and a rolling Modality is
+    produced from the accumulated features. Memory is bounded by one window
+    regardless of stream length. decay=1.0 gives a cumulative (whole-stream)
+    estimate, smaller values track recent speech more closely.
+    """
+    def __init__(self, window_seconds=2.0, decay=0.7, sr=TARGET_SR):
+        self.sr = sr
+        self.window = max(N_FFT, int(window_seconds * sr))
+        self.decay = decay
+        self._buf = np.zeros(self.window, dtype=np.float32)
+        self._fill = 0
+        self.samples_seen = 0
+        self.windows = 0
+        self._weight = 0.0
+        self._acc = {"rms": 0.0, "zcr": 0.0, "centroid": 0.0, "pitch": 0.0, "pitch_conf": 0.0, "mfcc_score": 0.0}
+
+    @property
+    def elapsed(self):
+        """Seconds of audio consumed so far."""
+        return self.samples_seen / float(self.sr)
+
+    def _fold(self, y):
+        f = extract_features(y, self.sr)
+        w = len(y) / float(self.window)
+        for k in self._acc:
+            self._acc[k] = self._acc[k] * self.decay + getattr(f, k) * w
+        self._weight = self._weight * self.decay + w
+        self.windows += 1
+        return self.estimate()
+
+    def estimate(self):
+        """Current rolling Modality (None before the first window)."""
+        if self._weight <= 0:
+            return None
+        avg = {k: v / self._weight for k, v in self._acc.items()}
+        return modality_from_features(AudioFeatures(sr=self.sr, **avg))
+
+    def feed(self, chunk):
+        """
+        Add PCM samples; returns the list of rolling Modality values for every
+        window completed by this chunk (usually zero or one).
+        """
+        chunk = np.asarray(chunk, dtype=np.float32).reshape(-1)
+        self.samples_seen += len(chunk)
+        out = []
+        pos = 0
+        while pos < len(chunk):
+            n = min(self.window - self._fill, len(chunk) - pos)
+            self._buf[self._fill:self._fill + n] = chunk[pos:pos + n]
+            self._fill += n
+            pos += n
+            if self._fill == self.window:
+                out.append(self._fold(self._buf))
+                self._fill = 0
+        return out
+
+    def flush(self, min_seconds=0.5):
+        """Score the trailing partial window if it is long enough."""
+        if self._fill < max(N_FFT, int(min_seconds * self.sr)):
+            self._fill = 0
+            return None
+        res = self._fold(self._buf[:self._fill].copy())
+        self._fill = 0
+        return res
+
+def _file_chunks(source, block_seconds):
+    import soundfile as sf
+    import soxr
+
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+
+    with sf.SoundFile(source) as f:
+        blocksize = max(1, int(block_seconds * f.samplerate))
+        resampler = None
+        if f.samplerate != TARGET_SR:
+            resampler = soxr.ResampleStream(f.samplerate, TARGET_SR, 1, dtype="float32")
+        for block in f.blocks(blocksize=blocksize, dtype="float32", always_2d=True):
+            mono = block.mean(axis=1) if block.shape[1] > 1 else block[:, 0]
+            if resampler is not None:
+                mono = resampler.resample_chunk(np.ascontiguousarray(mono), last=False)
+            yield mono
+        if resampler is not None:
+            yield resampler.resample_chunk(np.zeros(0, dtype=np.float32), last=True)
+
+def analyze_audio_stream(source, window_seconds=2.0, block_seconds=0.5, decay=0.7):
+    """
+    Yield a rolling Modality after every window_seconds of audio.
+
+    source: audio bytes, a path or file-like object (read block-wise through
+    soundfile and resampled on the fly to TARGET_SR), or an iterable of mono
+    float PCM chunks already at TARGET_SR (e.g. a live microphone feed).
+    """
+    if isinstance(source, (bytes, bytearray, str)) or hasattr(source, "read"):
+        chunks = _file_chunks(source, block_seconds)
+    else:
+        chunks = source
 
+    analyzer = AudioStreamAnalyzer(window_seconds=window_seconds, decay=decay)
+    for chunk in chunks:
+        for est in analyzer.feed(chunk):
+            yield est
+    last = analyzer.flush()
+    if last is not None:
+        yield last
@@ -0,0 +1,234 @@
+# multimodal_emotion/engine.py
+"""
+Concurrent scoring engine for the three modality analyzers.
+
+- Video, audio and text run in parallel in a warm process pool, so the
+  latency of one event is the slowest analyzer instead of their sum.
+- Workers import the cascades / librosa / TextBlob once and run a tiny
+  warm-up, so the first real request does not pay for imports or JIT.
+- Each modality has its own timeout; a late or failing analyzer falls back
+  to the same neutral Modality its own error path would return. A running
+  task cannot be cancelled, so after a timeout the pool is recycled: its
+  workers are terminated and a fresh pool starts warming right away, and
+  the stuck task never holds a worker the next event needs.
+- Inputs already scored (same bytes / text) are answered from a
+  content-hash memo instead of being re-scored on every rerun.
+- Results are handed to fusion.fuse().
+"""
+
+import io
+import time
+import atexit
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+
+from multimodal_emotion.types import Modality
+from multimodal_emotion.fusion import fuse
+from multimodal_emotion.memo import AnalyzerMemo, content_hash
+
+MODALITIES = ("video", "audio", "text")
+
+# workers are never forked from the Streamlit server: it runs threads
+# (write-behind, reply cache), and forking a threaded process can deadlock
+# on a lock another thread held at fork time
+START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+# seconds each analyzer may take before its default is used
+DEFAULT_TIMEOUTS = {"video": 2.0, "audio": 6.0, "text": 1.0}
+
+
+def default_result(name):
+    """Neutral fallback matching each analyzer's own error path."""
+    if name == "video":
+        return Modality("neutral", 0.2, 0.0, 0.2)
+    if name == "audio":
+        return Modality("neutral", 0.25, 0.0, 0.15)
+    return None
+
+
+# --------------------------------------------
+# Worker side (top-level so it can be pickled)
+# --------------------------------------------
+def _warm_worker():
+    import numpy as np
+    import soundfile as sf
+    from multimodal_emotion.video_emotion import analyze_video_frames
+    from multimodal_emotion.audio_emotion import analyze_audio
+    from multimodal_emotion.text_emotion import analyze_text
+
+    # exercise each analyzer once: loads lazy librosa submodules, numba JIT, TextBlob lexicon
+    try:
+        analyze_video_frames([np.zeros((64, 64), dtype=np.uint8)])
+        buf = io.BytesIO()
+        sr = 16000
+        t = np.arange(sr // 4) / sr
+        sf.write(buf, (0.1 * np.sin(2 * np.pi * 220 * t)).astype(np.float32), sr, format="WAV")
+        analyze_audio(buf.getvalue())
+        analyze_text("warm up")
+    except Exception as e:
+        print("engine warm-up ERROR:", e)
+
+def _ping():
+    return True
+
+def _run(name, payload):
+    if name == "video":
+        from multimodal_emotion.video_emotion import analyze_video_frame
+        return analyze_video_frame(payload)
+    if name == "audio":
+        from multimodal_emotion.audio_emotion import analyze_audio
+        return analyze_audio(payload)
+    from multimodal_emotion.text_emotion import analyze_text
+    return analyze_text(payload)
+
+
+# --------------------------------------------
+# Engine
+# --------------------------------------------
+class ScoringEngine:
+    def __init__(self, max_workers=3, timeouts=None, memo=None):
+        self.max_workers = max_workers
+        self.memo = memo
+        self.timeouts = dict(DEFAULT_TIMEOUTS)
+        if timeouts:
+            self.timeouts.update(timeouts)
+        self.last_timings = {}
+        self.recycles = 0
+        self._pool = None
+
+    def _start_pool(self):
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=multiprocessing.get_context(START_METHOD),
+            initializer=_warm_worker,
+        )
+        # start every worker now so the warm-up is not paid by the first event
+        return [self._pool.submit(_ping) for _ in range(self.max_workers)]
+
+    def _get_pool(self):
+        if self._pool is None:
+            for f in self._start_pool():
+                f.result()
+        return self._pool
+
+    def recycle(self):
+        """
+        Replace the pool after a timeout: terminate its workers (a running
+        analyzer cannot be cancelled) and start warming a fresh pool without
+        waiting for it, so the next event does not queue behind a stuck task.
+        """
+        pool, self._pool = self._pool, None
+        if pool is not None:
+            for proc in list((getattr(pool, "_processes", None) or {}).values()):
+                if proc.is_alive():
+                    proc.terminate()
+            pool.shutdown(wait=False, cancel_futures=True)
+        self.recycles += 1
+        try:
+            self._start_pool()
+        except (OSError, RuntimeError) as e:
+            print("engine pool ERROR:", e)
+            self._pool = None
+
+    def analyze(self, video=None, audio=None, text=None):
+        """
+        Run the analyzers for every non-empty input concurrently.
+        Returns {"video": Modality|None, "audio": Modality|None, "text": Modality|None}.
+        """
+        inputs = {"video": video, "audio": audio, "text": text}
+        if isinstance(text, str) and not text.strip():
+            inputs["text"] = None
+
+        results = {name: None for name in MODALITIES}
+        timings = {}
+
+        keys = {}
+        if self.memo is not None:
+            for name, payload in list(inputs.items()):
+                if payload is None:
+                    continue
+                keys[name] = content_hash(name, payload)
+                hit, cached = self.memo.get(keys[name])
+                if hit:
+                    results[name] = cached
+                    timings[name] = 0.0
+                    inputs[name] = None
+
+        if all(payload is None for payload in inputs.values()):
+            self.last_timings = timings
+            return results
+
+        try:
+            pool = self._get_pool()
+            futures = {
+                name: pool.submit(_run, name, payload)
+                for name, payload in inputs.items()
+                if payload is not None
+            }
+            start = time.perf_counter()
+        except (BrokenProcessPool, OSError, RuntimeError) as e:
+            # pool unavailable: score inline rather than drop the event
+            print("engine pool ERROR:", e)
+            self.shutdown()
+            for name, payload in inputs.items():
+                if payload is not None:
+                    t0 = time.perf_counter()
+                    results[name] = _run(name, payload)
+                    timings[name] = (time.perf_counter() - t0) * 1000.0
+                    self._remember(keys.get(name), results[name])
+            self.last_timings = timings
+            return results
+
+        timed_out = False
+        for name, fut in futures.items():
+            deadline = start + self.timeouts.get(name, 5.0)
+            try:
+                results[name] = fut.result(timeout=max(0.0, deadline - time.perf_counter()))
+                self._remember(keys.get(name), results[name])
+            except FutureTimeout:
+                timed_out = True
+                print(f"engine: {name} analyzer timed out")
+                results[name] = default_result(name)
+            except BrokenProcessPool as e:
+                print(f"engine: {name} worker died:", e)
+                self.shutdown()
+                results[name] = default_result(name)
+            except Exception as e:
+                print(f"engine: {name} analyzer ERROR:", e)
+                results[name] = default_result(name)
+            timings[name] = (time.perf_counter() - start) * 1000.0
+
+        if timed_out:
+            self.recycle()
+        self.last_timings = timings
+        return results
+
+    def _remember(self, key, result):
+        # only real analyzer output is memoized, never a timeout fallback
+        if self.memo is not None and key is not None:
+            self.memo.put(key, result)
+
+    def score(self, video=None, audio=None, text=None):
+        """Analyze all modalities concurrently and return the fused EmotionVector (or None)."""
+        res = self.analyze(video=video, audio=audio, text=text)
+        return fuse(video=res["video"], audio=res["audio"], text=res["text"])
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+_engine = None
+
+def get_engine():
+    """
+    Return the shared ScoringEngine.
+    Safe to call repeatedly (one warm pool per process).
+    """
+    global _engine
+    if _engine is None:
+        _engine = ScoringEngine(memo=AnalyzerMemo())
+        atexit.register(_engine.shutdown)
+    return _engine
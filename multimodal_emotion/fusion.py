@@ -9,48 +9,52 @@ Returns:
 - EmotionVector (from multimodal_emotion.types) or None
 """
 
+import numpy as np
 from multimodal_emotion.types import EmotionVector, ModalityScore
 
-def fuse(video=None, audio=None, text=None):
-    modalities = {}
-    vals, aros, confs = [], [], []
-    label_votes = {}
+# order in which fuse() visits modalities (matters for vote tie-breaking)
+MODALITY_ORDER = ("video", "audio", "text")
 
-    def extract(m):
-        """
-        Normalize modality to a simple dict with keys:
-        emotion, confidence, valence, arousal
-        """
-        if m is None:
-            return None
-
-        # Modality-like object with attributes
-        if hasattr(m, "emotion") and hasattr(m, "confidence"):
-            try:
-                return {
-                    "emotion": getattr(m, "emotion"),
-                    "confidence": float(getattr(m, "confidence") or 0.0),
-                    "valence": float(getattr(m, "valence") or 0.0),
-                    "arousal": float(getattr(m, "arousal") or 0.0),
-                }
-            except Exception:
-                # fallback to dictionary-style extraction
-                pass
-
-        # If dict-like
-        if isinstance(m, dict):
+def _extract(m):
+    """
+    Normalize modality to a simple dict with keys:
+    emotion, confidence, valence, arousal
+    """
+    if m is None:
+        return None
+
+    # Modality-like object with attributes
+    if hasattr(m, "emotion") and hasattr(m, "confidence"):
+        try:
             return {
-                "emotion": m.get("emotion"),
-                "confidence": float(m.get("confidence") or 0.0),
-                "valence": float(m.get("valence") or 0.0),
-                "arousal": float(m.get("arousal") or 0.0),
+                "emotion": getattr(m, "emotion"),
+                "confidence": float(getattr(m, "confidence") or 0.0),
+                "valence": float(getattr(m, "valence") or 0.0),
+                "arousal": float(getattr(m, "arousal") or 0.0),
             }
+        except Exception:
+            # fallback to dictionary-style extraction
+            pass
 
-        # Unknown type
-        return None
+    # If dict-like
+    if isinstance(m, dict):
+        return {
+            "emotion": m.get("emotion"),
+            "confidence": float(m.get("confidence") or 0.0),
+            "valence": float(m.get("valence") or 0.0),
+            "arousal": float(m.get("arousal") or 0.0),
+        }
+
+    # Unknown type
+    return None
+
+def fuse(video=None, audio=None, text=None):
+    modalities = {}
+    vals, aros, confs = [], [], []
+    label_votes = {}
 
     def add(m, name):
-        norm = extract(m)
+        norm = _extract(m)
         if not norm or not norm.get("emotion"):
             return
 
@@ -91,3 +95,104 @@ def fuse(video=None, audio=None, text=None):
         confidence=confidence,
         modalities=modalities
     )
+
+
+# --------------------------------------------
+# Vectorized fusion for re-scoring / replay
+# --------------------------------------------
+def encode_modalities(events, label_names=None):
+    """
+    Build the columnar input of fuse_batch from a sequence of events, each a
+    dict {"video": m, "audio": m, "text": m} where m is a Modality, a dict or None.
+
+    Returns (columns, label_names): columns holds (N, 3) arrays "labels",
+    "confidence", "valence", "arousal" and "present", with modality axis in
+    MODALITY_ORDER; label_names maps label codes back to emotion strings.
+    """
+    label_names = list(label_names or [])
+    codes = {name: i for i, name in enumerate(label_names)}
+    n, m = len(events), len(MODALITY_ORDER)
+
+    labels = np.zeros((n, m), dtype=np.int64)
+    conf = np.zeros((n, m), dtype=np.float64)
+    val = np.zeros((n, m), dtype=np.float64)
+    aro = np.zeros((n, m), dtype=np.float64)
+    present = np.zeros((n, m), dtype=bool)
+
+    for i, ev in enumerate(events):
+        for j, name in enumerate(MODALITY_ORDER):
+            norm = _extract(ev.get(name))
+            if not norm or not norm.get("emotion"):
+                continue
+            label = norm["emotion"]
+            if label not in codes:
+                codes[label] = len(label_names)
+                label_names.append(label)
+            labels[i, j] = codes[label]
+            conf[i, j] = norm["confidence"]
+            val[i, j] = norm["valence"]
+            aro[i, j] = norm["arousal"]
+            present[i, j] = True
+
+    columns = {"labels": labels, "confidence": conf, "valence": val, "arousal": aro, "present": present}
+    return columns, label_names
+
+def fuse_batch(labels, confidence, valence, arousal, present=None, n_labels=None):
+    """
+    Fuse N events at once. Inputs are (N, M) arrays with the modality axis in
+    MODALITY_ORDER; labels holds integer emotion codes and present marks the
+    modalities fuse() would have accepted.
+
+    Returns a dict of (N,) arrays: "valid" (False where fuse() returns None),
+    "emotion" (winning label code, -1 where invalid), "valence", "arousal",
+    "confidence". Sums run in the same order as fuse(), so results are
+    bit-for-bit identical, including its first-seen tie-breaking of votes.
+    """
+    labels = np.asarray(labels, dtype=np.int64)
+    confidence = np.asarray(confidence, dtype=np.float64)
+    valence = np.asarray(valence, dtype=np.float64)
+    arousal = np.asarray(arousal, dtype=np.float64)
+    n, m = labels.shape
+    present = np.ones((n, m), dtype=bool) if present is None else np.asarray(present, dtype=bool)
+    if n_labels is None:
+        n_labels = int(labels.max()) + 1 if labels.size else 1
+    # at least one vote column, so an empty batch still reduces cleanly
+    n_labels = max(1, int(n_labels))
+
+    rows = np.arange(n)
+    zeros = np.zeros(n, dtype=np.float64)
+    sum_v, sum_a, total_conf = zeros.copy(), zeros.copy(), zeros.copy()
+    count = present.sum(axis=1)
+
+    votes = np.zeros((n, n_labels), dtype=np.float64)
+    first_seen = np.full((n, n_labels), m, dtype=np.int64)
+
+    for j in range(m):
+        p = present[:, j]
+        c = np.where(p, confidence[:, j], 0.0)
+        sum_v += np.where(p, valence[:, j] * confidence[:, j], 0.0)
+        sum_a += np.where(p, arousal[:, j] * confidence[:, j], 0.0)
+        total_conf += c
+
+        code = np.where(p, labels[:, j], 0)
+        votes[rows, code] += c
+        seen = first_seen[rows, code]
+        first_seen[rows, code] = np.where(p & (seen > j), j, seen)
+
+    # winner: highest vote, ties go to the label voted for first
+    masked = np.where(first_seen < m, votes, -np.inf)
+    best = masked.max(axis=1, keepdims=True)
+    order = np.where(masked == best, first_seen, m + 1)
+    emotion = np.argmin(order, axis=1)
+
+    valid = count > 0
+    nonzero = total_conf != 0
+    safe_conf = np.where(nonzero, total_conf, 1.0)
+
+    return {
+        "valid": valid,
+        "emotion": np.where(valid, emotion, -1),
+        "valence": np.where(valid & nonzero, sum_v / safe_conf, 0.0),
+        "arousal": np.where(valid & nonzero, sum_a / safe_conf, 0.0),
+        "confidence": np.where(valid, total_conf / np.maximum(count, 1), 0.0),
+    }
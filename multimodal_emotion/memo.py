@@ -0,0 +1,66 @@
+# multimodal_emotion/memo.py
+"""
+Memoization of analyzer results by input content.
+
+- Keys are a blake2b hash of the modality name and the raw input (frame /
+  audio bytes or text), so an unchanged photo, clip or sentence on a
+  Streamlit rerun returns its cached Modality without being re-scored.
+- Bounded LRU of at most max_entries results; the least recently used are
+  evicted first. Entries are a hash key and a small Modality, so the entry
+  count is the only budget (the inputs themselves are never stored).
+- Optional ttl (seconds) after which an entry is scored again.
+- Only real analyzer results are stored; timeouts / fallbacks are not.
+"""
+
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+def content_hash(name, payload):
+    """Hex digest identifying one analyzer input."""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(name.encode("utf-8"))
+    h.update(b"\x00")
+    h.update(payload.encode("utf-8") if isinstance(payload, str) else bytes(payload))
+    return h.hexdigest()
+
+
+class AnalyzerMemo:
+    def __init__(self, max_entries=256, ttl=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()   # key -> (created, result)
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "expired": 0}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """(True, result) on a hit, (False, None) on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl is not None and time.time() - entry[0] > self.ttl:
+                del self._entries[key]
+                self.stats["expired"] += 1
+                entry = None
+            if entry is None:
+                self.stats["misses"] += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return True, entry[1]
+
+    def put(self, key, result):
+        with self._lock:
+            self._entries[key] = (time.time(), result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -1,10 +1,11 @@
 # multimodal_emotion/types.py
-from dataclasses import dataclass, asdict
+# dataclass(slots=True) needs Python 3.10+
+from dataclasses import dataclass
 
 # --------------------------------------------
 # Base unit returned by video/audio/text models
 # --------------------------------------------
-@dataclass
+@dataclass(slots=True)
 class Modality:
     emotion: str = None
     confidence: float = 0.0
@@ -19,7 +20,12 @@ class Modality:
         return getattr(self, key, default)
 
     def to_dict(self):
-        return asdict(self)
+        return {
+            "emotion": self.emotion,
+            "confidence": self.confidence,
+            "valence": self.valence,
+            "arousal": self.arousal,
+        }
 
     def items(self):
         return self.to_dict().items()
@@ -31,7 +37,7 @@ class Modality:
 # --------------------------------------------
 # Fusion helper: represent one modality’s score
 # --------------------------------------------
-@dataclass
+@dataclass(slots=True)
 class ModalityScore:
     emotion: str
     confidence: float
@@ -45,13 +51,18 @@ class ModalityScore:
         return getattr(self, key, default)
 
     def to_dict(self):
-        return asdict(self)
+        return {
+            "emotion": self.emotion,
+            "confidence": self.confidence,
+            "valence": self.valence,
+            "arousal": self.arousal,
+        }
 
 
 # --------------------------------------------
 # Final fused emotional state returned by fusion.py
 # --------------------------------------------
-@dataclass
+@dataclass(slots=True)
 class EmotionVector:
     final_emotion: str
     valence: float
@@ -78,4 +89,3 @@ class EmotionVector:
             },
         }
 
-
@@ -4,6 +4,7 @@ import cv2
 import numpy as np
 from PIL import Image
 import io
+import time
 from multimodal_emotion.types import Modality
 
 face_cascade_path = cv2.data.haarcascades + "haarcascade_frontalface_default.xml"
@@ -19,6 +20,13 @@ VALENCE_MAP = {
     "sad": -0.6, "angry": -0.9, "fear": -0.7, "disgust": -0.8
 }
 
+# face search runs on frames downscaled so their longer side is at most this
+WORKING_SIZE = 640
+# smile / eye / contrast cues run on the face crop resized to this (w, h)
+FACE_SIZE = (160, 160)
+# the frontal-face cascade's own window; smaller minSize values do nothing
+_CASCADE_WINDOW = 24
+
 def _safe_area(rect):
     x,y,w,h = rect
     return max(1, w*h)
@@ -38,82 +46,331 @@ def _mouth_open_ratio(face_gray):
         return 0.0
     return float(np.mean(mouth) / (np.mean(face_gray) + 1e-6))
 
-def analyze_video_frame(frame_bytes):
+def _score_face(face_gray):
+    """
+    Map a grayscale face crop to a Modality using the smile/eye/contrast heuristics.
+    """
+    # detect smiles & eyes with tuned params
+    smiles = smile_cascade.detectMultiScale(face_gray, scaleFactor=1.6, minNeighbors=18, minSize=(8,8))
+    eyes = eye_cascade.detectMultiScale(face_gray, scaleFactor=1.1, minNeighbors=6, minSize=(8,8))
+
+    # features
+    smile_count = len(smiles)
+    eye_count = len(eyes)
+    mouth_ratio = _mouth_open_ratio(face_gray)
+    contrast = _contrast(face_gray)
+
+    # signals (0..1)
+    smile_signal = min(1.0, smile_count * 0.7 + mouth_ratio * 0.3)
+    surprise_signal = min(1.0, eye_count * 0.5 + mouth_ratio * 0.6 + contrast * 0.2)
+    neutral_signal = 0.15
+    sad_signal = max(0.0, 0.25 - smile_signal) * 0.8
+    angry_signal = max(0.0, 0.2 - smile_signal) * 0.6
+    fear_signal = max(0.0, 0.2 - smile_signal) * (1 - eye_count*0.2)
+    disgust_signal = 0.02
+
+    scores = {
+        "happy": smile_signal,
+        "surprise": surprise_signal,
+        "neutral": neutral_signal,
+        "sad": sad_signal,
+        "angry": angry_signal,
+        "fear": fear_signal,
+        "disgust": disgust_signal
+    }
+
+    # soft-normalize & smoothing
+    total = sum(scores.values()) + 1e-9
+    for k in scores:
+        scores[k] = float(scores[k] / total)
+
+    emotion = max(scores, key=lambda k: scores[k])
+    raw_conf = float(scores[emotion])
+
+    # confidence boost if multiple cues agree
+    cue_strength = (smile_signal + surprise_signal + (eye_count/2.0)) / 3.0
+    confidence = min(1.0, raw_conf * 0.9 + cue_strength * 0.2)
+
+    valence = VALENCE_MAP.get(emotion, 0.0)
+    arousal = min(1.0, 0.2 + confidence * 0.9)
+
+    return Modality(emotion=emotion, confidence=confidence, valence=valence, arousal=arousal)
+
+def _working_scale(shape, working_size=WORKING_SIZE):
+    """Downscale factor (<= 1) that brings the longer side to working_size."""
+    longest = max(shape[:2])
+    if not working_size or longest <= working_size:
+        return 1.0
+    return working_size / float(longest)
+
+def _working_shape(shape, working_size=WORKING_SIZE):
+    """(width, height) the face search actually runs at."""
+    scale = _working_scale(shape, working_size)
+    return (max(1, int(round(shape[1] * scale))), max(1, int(round(shape[0] * scale))))
+
+def _detect_face(gray, min_size=(48,48), working_size=WORKING_SIZE, buffers=None):
+    """
+    Largest face box in full-resolution coordinates, or None.
+    The search runs on a copy downscaled (INTER_AREA) to working_size;
+    min_size is given in full-resolution pixels.
+    """
+    scale = _working_scale(gray.shape, working_size)
+    if scale < 1.0:
+        size = _working_shape(gray.shape, working_size)
+        dst = buffers.get((size[1], size[0]), "working") if buffers is not None else None
+        small = cv2.resize(gray, size, dst=dst, interpolation=cv2.INTER_AREA)
+        min_size = tuple(max(_CASCADE_WINDOW, int(round(v * scale))) for v in min_size)
+    else:
+        small = gray
+
+    faces = face_cascade.detectMultiScale(small, scaleFactor=1.15, minNeighbors=5, minSize=min_size)
+    if len(faces) == 0:
+        return None
+    # pick largest face, mapped back to full resolution
+    x, y, w, h = max(faces, key=_safe_area)
+    if scale < 1.0:
+        H, W = gray.shape[:2]
+        x, y = int(x / scale), int(y / scale)
+        w, h = min(W - x, int(round(w / scale))), min(H - y, int(round(h / scale)))
+    return (int(x), int(y), int(w), int(h))
+
+def _normalize_face(face_gray, face_size=FACE_SIZE, buffers=None):
+    """Resize a face crop to a fixed size so the cue heuristics see one scale."""
+    if not face_size or face_gray.shape[1::-1] == tuple(face_size):
+        return face_gray
+    shrink = face_gray.shape[1] > face_size[0]
+    dst = buffers.get((face_size[1], face_size[0]), "face") if buffers is not None else None
+    return cv2.resize(face_gray, tuple(face_size), dst=dst, interpolation=cv2.INTER_AREA if shrink else cv2.INTER_LINEAR)
+
+def _score_gray(gray, working_size=WORKING_SIZE, face_size=FACE_SIZE, buffers=None):
+    face = _detect_face(gray, working_size=working_size, buffers=buffers)
+
+    if face is None:
+        # No face: low-confidence neutral fallback
+        return Modality("neutral", 0.25, 0.0, 0.18)
+
+    x,y,w,h = face
+    return _score_face(_normalize_face(gray[y:y+h, x:x+w], face_size, buffers))
+
+def _decode_bytes(frame_bytes):
+    """
+    Encoded image bytes -> grayscale. Every entry point decodes through PIL
+    RGB and cv2's RGB -> gray weights, so the same bytes give the same pixels
+    (cv2.imdecode(IMREAD_GRAYSCALE) differs by a few levels on JPEGs).
+    """
+    rgb = np.asarray(Image.open(io.BytesIO(frame_bytes)).convert("RGB"))
+    return cv2.cvtColor(rgb, cv2.COLOR_RGB2GRAY)
+
+def analyze_video_frame(frame_bytes, working_size=WORKING_SIZE):
     """
     Input: frame bytes from Streamlit camera_input.getvalue()
     Output: Modality(emotion, confidence, valence, arousal)
     """
     try:
-        img = Image.open(io.BytesIO(frame_bytes)).convert("RGB")
-        arr = np.array(img)
-        gray = cv2.cvtColor(arr, cv2.COLOR_RGB2GRAY)
-
-        faces = face_cascade.detectMultiScale(gray, scaleFactor=1.15, minNeighbors=5, minSize=(48,48))
-
-        if len(faces) == 0:
-            # No face: low-confidence neutral fallback
-            return Modality("neutral", 0.25, 0.0, 0.18)
-
-        # pick largest face
-        face = max(faces, key=_safe_area)
-        x,y,w,h = face
-        face_gray = gray[y:y+h, x:x+w]
-
-        # detect smiles & eyes with tuned params
-        smiles = smile_cascade.detectMultiScale(face_gray, scaleFactor=1.6, minNeighbors=18, minSize=(8,8))
-        eyes = eye_cascade.detectMultiScale(face_gray, scaleFactor=1.1, minNeighbors=6, minSize=(8,8))
-
-        # features
-        smile_count = len(smiles)
-        eye_count = len(eyes)
-        mouth_ratio = _mouth_open_ratio(face_gray)
-        contrast = _contrast(face_gray)
-
-        # signals (0..1)
-        smile_signal = min(1.0, smile_count * 0.7 + mouth_ratio * 0.3)
-        surprise_signal = min(1.0, eye_count * 0.5 + mouth_ratio * 0.6 + contrast * 0.2)
-        neutral_signal = 0.15
-        sad_signal = max(0.0, 0.25 - smile_signal) * 0.8
-        angry_signal = max(0.0, 0.2 - smile_signal) * 0.6
-        fear_signal = max(0.0, 0.2 - smile_signal) * (1 - eye_count*0.2)
-        disgust_signal = 0.02
-
-        scores = {
-            "happy": smile_signal,
-            "surprise": surprise_signal,
-            "neutral": neutral_signal,
-            "sad": sad_signal,
-            "angry": angry_signal,
-            "fear": fear_signal,
-            "disgust": disgust_signal
-        }
-
-        # soft-normalize & smoothing
-        total = sum(scores.values()) + 1e-9
-        for k in scores:
-            scores[k] = float(scores[k] / total)
-
-        emotion = max(scores, key=lambda k: scores[k])
-        raw_conf = float(scores[emotion])
-
-        # confidence boost if multiple cues agree
-        cue_strength = (smile_signal + surprise_signal + (eye_count/2.0)) / 3.0
-        confidence = min(1.0, raw_conf * 0.9 + cue_strength * 0.2)
-
-        valence = VALENCE_MAP.get(emotion, 0.0)
-        arousal = min(1.0, 0.2 + confidence * 0.9)
-
-        return Modality(emotion=emotion, confidence=confidence, valence=valence, arousal=arousal)
+        gray = _decode_bytes(frame_bytes)
+        return _score_gray(gray, working_size=working_size)
 
     except Exception as e:
         print("video_emotion ERROR:", e)
         return Modality("neutral", 0.2, 0.0, 0.2)
 
 
+# --------------------------------------------
+# Batched API for recorded clips
+# --------------------------------------------
+class _GrayBuffers:
+    """
+    Reusable uint8 buffers keyed by (role, shape), so scoring a clip of
+    same-sized frames does not allocate fresh arrays per frame: "gray" holds
+    the RGB -> gray conversion, "working" the downscaled face-search copy and
+    "face" the normalized face crop. Each role is overwritten by the next frame.
+    """
+    def __init__(self):
+        self._bufs = {}
+
+    def get(self, shape, role="gray"):
+        key = (role, shape)
+        buf = self._bufs.get(key)
+        if buf is None:
+            buf = np.empty(shape, dtype=np.uint8)
+            self._bufs[key] = buf
+        return buf
+
+def _decode_gray(frame, buffers):
+    if isinstance(frame, (bytes, bytearray, memoryview)):
+        return _decode_bytes(bytes(frame))
+
+    arr = np.asarray(frame)
+    if arr.ndim == 2:
+        return arr if arr.dtype == np.uint8 else arr.astype(np.uint8)
+    if arr.ndim == 3 and arr.shape[2] in (3, 4):
+        code = cv2.COLOR_RGB2GRAY if arr.shape[2] == 3 else cv2.COLOR_RGBA2GRAY
+        return cv2.cvtColor(arr, code, dst=buffers.get(arr.shape[:2]))
+    raise ValueError(f"unsupported frame shape {arr.shape}")
+
+def iter_video_frames(frames, batch_size=32, working_size=WORKING_SIZE):
+    """
+    Score many frames (e.g. a recorded clip), one batch at a time.
+
+    Input: iterable of encoded image bytes or RGB / grayscale NumPy arrays.
+    Yields: (list of Modality, list of per-frame timing dicts in milliseconds,
+    each also giving the (width, height) face search ran at as working_size)
+    for every batch_size frames.
+
+    Only one batch of frames and results is held at a time, so arbitrarily
+    long iterables (generators over a video file) are scored in bounded memory.
+    Encoded bytes are decoded like analyze_video_frame (PIL, which always
+    allocates); the downscaled search copy and the face crop reuse buffers
+    for both input kinds.
+    """
+    batch_size = max(1, int(batch_size))
+    buffers = _GrayBuffers()
+
+    def run(batch):
+        results, timings = [], []
+        for frame in batch:
+            t0 = time.perf_counter()
+            working = None
+            try:
+                gray = _decode_gray(frame, buffers)
+                t1 = time.perf_counter()
+                working = _working_shape(gray.shape, working_size)
+                res = _score_gray(gray, working_size=working_size, buffers=buffers)
+            except Exception as e:
+                print("video_emotion ERROR:", e)
+                t1 = time.perf_counter()
+                res = Modality("neutral", 0.2, 0.0, 0.2)
+            t2 = time.perf_counter()
+            results.append(res)
+            timings.append({
+                "decode_ms": (t1 - t0) * 1000.0,
+                "detect_ms": (t2 - t1) * 1000.0,
+                "total_ms": (t2 - t0) * 1000.0,
+                "working_size": working,
+            })
+        return results, timings
+
+    batch = []
+    for frame in frames:
+        batch.append(frame)
+        if len(batch) >= batch_size:
+            yield run(batch)
+            batch = []
+    if batch:
+        yield run(batch)
+
+def analyze_video_frames(frames, batch_size=32, working_size=WORKING_SIZE):
+    """
+    Score many frames in one call and collect every result.
+
+    Output: (list of Modality, list of per-frame timing dicts) for the whole
+    input. The lists grow with the clip; use iter_video_frames to consume
+    long recordings batch by batch instead.
+    """
+    results, timings = [], []
+    for res, tim in iter_video_frames(frames, batch_size=batch_size, working_size=working_size):
+        results.extend(res)
+        timings.extend(tim)
+    return results, timings
+
+
+# --------------------------------------------
+# Live tracking mode
+# --------------------------------------------
+def _iou(a, b):
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    ix = max(0, min(ax + aw, bx + bw) - max(ax, bx))
+    iy = max(0, min(ay + ah, by + bh) - max(ay, by))
+    inter = ix * iy
+    union = _safe_area(a) + _safe_area(b) - inter
+    return inter / union if union > 0 else 0.0
+
+class VideoEmotionTracker:
+    """
+    Stateful analyzer for consecutive frames of one live stream.
+
+    Full-frame face detection runs only on keyframes (every keyframe_interval
+    frames, or when the face is lost). In between, the face cascade searches a
+    padded ROI around the last face box, and smile/eye cues run on that crop.
+    Tracking confidence is the IoU between the new and previous box; when it
+    drops below min_iou the tracker falls back to a full detection.
+    Keyframe searches run at working_size like analyze_video_frame; the
+    size used last is kept in working_shape.
+    """
+    def __init__(self, keyframe_interval=10, roi_padding=0.3, min_iou=0.3,
+                 working_size=WORKING_SIZE, face_size=FACE_SIZE):
+        self.keyframe_interval = max(1, int(keyframe_interval))
+        self.roi_padding = roi_padding
+        self.min_iou = min_iou
+        self.working_size = working_size
+        self.face_size = face_size
+        self.working_shape = None
+        self.stats = {"frames": 0, "full_detections": 0, "roi_detections": 0, "lost": 0}
+        self._buffers = _GrayBuffers()
+        self.reset()
+
+    def reset(self):
+        self.box = None
+        self.tracking_confidence = 0.0
+        self._since_keyframe = 0
+
+    def _track(self, gray):
+        x, y, w, h = self.box
+        pad = int(max(w, h) * self.roi_padding)
+        H, W = gray.shape[:2]
+        x0, y0 = max(0, x - pad), max(0, y - pad)
+        x1, y1 = min(W, x + w + pad), min(H, y + h + pad)
+
+        # the face can only have moved a little: skip scales far below the last box
+        side = max(48, int(min(w, h) * 0.7))
+        roi = gray[y0:y1, x0:x1]
+        self.working_shape = _working_shape(roi.shape, self.working_size)
+        face = _detect_face(roi, min_size=(side, side), working_size=self.working_size, buffers=self._buffers)
+        if face is None:
+            return None
+        fx, fy, fw, fh = face
+        box = (x0 + fx, y0 + fy, fw, fh)
 
+        self.tracking_confidence = _iou(box, self.box)
+        if self.tracking_confidence < self.min_iou:
+            return None
+        return box
 
+    def update(self, frame):
+        """
+        Input: encoded frame bytes or an RGB / grayscale NumPy array
+        Output: Modality(emotion, confidence, valence, arousal)
+        """
+        self.stats["frames"] += 1
+        try:
+            gray = _decode_gray(frame, self._buffers)
 
+            box = None
+            if self.box is not None and self._since_keyframe < self.keyframe_interval:
+                box = self._track(gray)
+                if box is None:
+                    self.stats["lost"] += 1
+                else:
+                    self.stats["roi_detections"] += 1
+                    self._since_keyframe += 1
 
+            if box is None:
+                self.stats["full_detections"] += 1
+                self.working_shape = _working_shape(gray.shape, self.working_size)
+                box = _detect_face(gray, working_size=self.working_size, buffers=self._buffers)
+                self._since_keyframe = 0
+                self.tracking_confidence = 1.0 if box is not None else 0.0
 
+            self.box = box
+            if box is None:
+                # No face: low-confidence neutral fallback
+                return Modality("neutral", 0.25, 0.0, 0.18)
 
+            x, y, w, h = box
+            return _score_face(_normalize_face(gray[y:y+h, x:x+w], self.face_size, self._buffers))
 
+        except Exception as e:
+            print("video_emotion ERROR:", e)
+            self.reset()
+            return Modality("neutral", 0.2, 0.0, 0.2)
@@ -0,0 +1,247 @@
+# session_system/analytics.py
+"""
+Dashboard analytics pushed into the database.
+
+- Session listing, per-session metric rollups and row counts run as SQL
+  (a view + an RPC function in Supabase/Postgres), so dashboard loads scale
+  with the number of sessions, not the number of logged events.
+- SQLiteAnalytics runs the same queries against a local SQLite database
+  and is used as a stand-in when Supabase is not available (e.g. tests).
+
+Apply POSTGRES_SCHEMA once in the Supabase SQL editor.
+"""
+
+import json
+import sqlite3
+
+POSTGRES_SCHEMA = """
+create index if not exists emotion_logs_session_ts on emotion_logs (session_id, "timestamp");
+
+-- idempotency key written by SessionManager.log; upserts skip existing keys
+alter table emotion_logs add column if not exists event_key text;
+create unique index if not exists emotion_logs_event_key on emotion_logs (event_key);
+
+-- maintained incrementally by SessionManager (see session_system/rollup.py)
+create table if not exists session_rollups (
+    session_id text primary key,
+    events integer,
+    sum_valence double precision,
+    sum_arousal double precision,
+    emotions jsonb,
+    spikes jsonb,
+    first_ts text,
+    last_ts text,
+    valence_drop double precision,
+    arousal_rise double precision
+);
+
+create or replace view emotion_sessions as
+select session_id, max("timestamp") as last_timestamp, count(*) as events
+from emotion_logs
+where session_id is not null
+group by session_id;
+
+create or replace function emotion_session_metrics(p_session_id text)
+returns table (events bigint, avg_valence double precision, avg_arousal double precision, dominant_emotion text)
+language sql stable as $$
+  select count(*), avg(valence), avg(arousal),
+         (select emotion from emotion_logs
+          where session_id = p_session_id
+          group by emotion
+          order by count(*) desc, min("timestamp") asc
+          limit 1)
+  from emotion_logs
+  where session_id = p_session_id;
+$$;
+"""
+
+SQLITE_SCHEMA = """
+create table if not exists emotion_logs (
+    session_id text,
+    emotion text,
+    valence real,
+    arousal real,
+    confidence real,
+    brain_action text,
+    micro_prompt text,
+    timestamp text,
+    modalities text,
+    event_key text
+);
+create index if not exists emotion_logs_session_ts on emotion_logs (session_id, timestamp);
+create unique index if not exists emotion_logs_event_key on emotion_logs (event_key);
+create table if not exists session_rollups (
+    session_id text primary key,
+    events integer,
+    sum_valence real,
+    sum_arousal real,
+    emotions text,
+    spikes text,
+    first_ts text,
+    last_ts text,
+    valence_drop real,
+    arousal_rise real
+);
+"""
+
+_ROLLUP_COLUMNS = (
+    "session_id", "events", "sum_valence", "sum_arousal", "emotions", "spikes",
+    "first_ts", "last_ts", "valence_drop", "arousal_rise",
+)
+
+# ties on the dominant emotion go to the one seen first, like the Python scan did
+_METRICS_SQL = """
+select count(*), avg(valence), avg(arousal),
+       (select emotion from emotion_logs
+        where session_id = :sid
+        group by emotion
+        order by count(*) desc, min(timestamp) asc
+        limit 1)
+from emotion_logs
+where session_id = :sid
+"""
+
+
+def _metrics(events, avg_v, avg_a, dominant):
+    if not events:
+        return {}
+    return {
+        "avg_valence": float(avg_v or 0.0),
+        "avg_arousal": float(avg_a or 0.0),
+        "dominant_emotion": dominant or "n/a",
+        "events": int(events),
+    }
+
+
+def compute_session_metrics(rows):
+    """
+    Metrics computed from fetched rows, for when the database cannot run the
+    query itself (local files, DB errors). Same shape as session_metrics().
+    """
+    if not rows:
+        return {}
+    valences, arousals, emotions = [], [], {}
+    for r in rows:
+        fe = r.get("fused_emotion") or {}
+        v = fe.get("valence", r.get("valence", 0))
+        a = fe.get("arousal", r.get("arousal", 0))
+        e = fe.get("emotion", r.get("emotion", "unknown"))
+        valences.append(v)
+        arousals.append(a)
+        emotions[e] = emotions.get(e, 0) + 1
+    return {
+        "avg_valence": sum(valences)/len(valences) if valences else 0,
+        "avg_arousal": sum(arousals)/len(arousals) if arousals else 0,
+        "dominant_emotion": max(emotions, key=emotions.get) if emotions else "n/a",
+        "events": len(rows)
+    }
+
+
+class SupabaseAnalytics:
+    def __init__(self, db):
+        self.db = db
+
+    def list_sessions(self, limit=100):
+        resp = (
+            self.db.table("emotion_sessions")
+            .select("session_id,last_timestamp")
+            .order("last_timestamp", desc=True)
+            .limit(limit)
+            .execute()
+        )
+        return [{"session_id": r["session_id"], "timestamp": r["last_timestamp"]} for r in (resp.data or [])]
+
+    def session_metrics(self, session_id):
+        resp = self.db.rpc("emotion_session_metrics", {"p_session_id": session_id}).execute()
+        rows = resp.data or []
+        if not rows:
+            return {}
+        r = rows[0]
+        return _metrics(r.get("events"), r.get("avg_valence"), r.get("avg_arousal"), r.get("dominant_emotion"))
+
+    def session_rollup(self, session_id):
+        resp = self.db.table("session_rollups").select("*").eq("session_id", session_id).limit(1).execute()
+        rows = resp.data or []
+        return rows[0] if rows else None
+
+    def count_rows(self):
+        # exact count computed server-side; only one row comes back
+        resp = self.db.table("emotion_logs").select("session_id", count="exact").limit(1).execute()
+        return int(resp.count or 0)
+
+
+class SQLiteAnalytics:
+    def __init__(self, path=":memory:"):
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.executescript(SQLITE_SCHEMA)
+
+    def insert(self, rows):
+        """Insert rows shaped like the Supabase emotion_logs payload (existing event keys are skipped)."""
+        self.conn.executemany(
+            "insert or ignore into emotion_logs values (:session_id, :emotion, :valence, :arousal, :confidence,"
+            " :brain_action, :micro_prompt, :timestamp, :modalities, :event_key)",
+            [
+                {
+                    "session_id": r.get("session_id"),
+                    "emotion": r.get("emotion"),
+                    "valence": r.get("valence"),
+                    "arousal": r.get("arousal"),
+                    "confidence": r.get("confidence"),
+                    "brain_action": r.get("brain_action"),
+                    "micro_prompt": r.get("micro_prompt"),
+                    "timestamp": r.get("timestamp"),
+                    "modalities": json.dumps(r.get("modalities") or {}),
+                    "event_key": r.get("event_key"),
+                }
+                for r in rows
+            ],
+        )
+        self.conn.commit()
+
+    def upsert_rollups(self, rows):
+        """Store SessionRollup.to_dict() rows; a newer snapshot replaces the stored one."""
+        self.conn.executemany(
+            "insert or replace into session_rollups values (:session_id, :events, :sum_valence, :sum_arousal,"
+            " :emotions, :spikes, :first_ts, :last_ts, :valence_drop, :arousal_rise)",
+            [
+                {**r, "emotions": json.dumps(r.get("emotions") or {}), "spikes": json.dumps(r.get("spikes") or [])}
+                for r in rows
+            ],
+        )
+        self.conn.commit()
+
+    def list_sessions(self, limit=100):
+        cur = self.conn.execute(
+            "select session_id, max(timestamp) as last_ts from emotion_logs"
+            " where session_id is not null group by session_id order by last_ts desc limit ?",
+            (limit,),
+        )
+        return [{"session_id": sid, "timestamp": ts} for sid, ts in cur.fetchall()]
+
+    def session_metrics(self, session_id):
+        row = self.conn.execute(_METRICS_SQL, {"sid": session_id}).fetchone()
+        return _metrics(*row) if row else {}
+
+    def session_rollup(self, session_id):
+        row = self.conn.execute(
+            "select * from session_rollups where session_id = ? limit 1", (session_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        out = dict(zip(_ROLLUP_COLUMNS, row))
+        out["emotions"] = json.loads(out["emotions"] or "{}")
+        out["spikes"] = json.loads(out["spikes"] or "[]")
+        return out
+
+    def count_rows(self):
+        return int(self.conn.execute("select count(*) from emotion_logs").fetchone()[0])
+
+
+def get_analytics(db=None):
+    """
+    Return the analytics backend for a Supabase client, or None when the
+    DB is not configured (callers then fall back to local files).
+    """
+    if db is None:
+        return None
+    return SupabaseAnalytics(db)
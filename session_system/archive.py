@@ -0,0 +1,124 @@
+# session_system/archive.py
+"""
+Columnar session archive (Parquet).
+
+- Sessions are flattened to one row per event with plain columns:
+  session_id, timestamp, emotion, valence, arousal, confidence,
+  brain_action and <modality>_{emotion,confidence,valence,arousal}.
+- Works for both local timeline events (nested fused_emotion) and
+  Supabase emotion_logs rows (flat columns + modalities dict).
+- read_archive() supports column projection and time-range / session
+  filters pushed down into the Parquet reader, and returns a DataFrame
+  without any Python-level row loop.
+
+Requires pandas + pyarrow.
+"""
+
+import os
+import json
+import pandas as pd
+
+from session_system.journal import journal_segments, read_journal, session_path
+
+MODALITIES = ("video", "audio", "text")
+MODALITY_FIELDS = ("emotion", "confidence", "valence", "arousal")
+
+ARCHIVE_COLUMNS = (
+    ["session_id", "timestamp", "emotion", "valence", "arousal", "confidence", "brain_action"]
+    + [f"{m}_{f}" for m in MODALITIES for f in MODALITY_FIELDS]
+)
+
+_FLOAT_COLUMNS = ["valence", "arousal", "confidence"] + [
+    f"{m}_{f}" for m in MODALITIES for f in MODALITY_FIELDS if f != "emotion"
+]
+
+
+def _pick(flat, *names):
+    # first column that exists, else an all-missing column
+    for name in names:
+        if name in flat:
+            return flat[name]
+    return pd.Series([None] * len(flat), index=flat.index, dtype=object)
+
+
+def events_to_frame(rows, session_id=None):
+    """Flatten timeline events / emotion_logs rows into the archive columns."""
+    rows = list(rows)
+    if not rows:
+        return pd.DataFrame({c: pd.Series(dtype=object) for c in ARCHIVE_COLUMNS})
+
+    flat = pd.json_normalize(rows)
+    out = pd.DataFrame(index=flat.index)
+
+    out["session_id"] = _pick(flat, "session_id")
+    if session_id is not None:
+        out["session_id"] = out["session_id"].fillna(session_id)
+    out["timestamp"] = pd.to_datetime(_pick(flat, "timestamp"))
+    out["emotion"] = _pick(flat, "fused_emotion.emotion", "emotion")
+    for col in ("valence", "arousal", "confidence"):
+        out[col] = _pick(flat, f"fused_emotion.{col}", col)
+    out["brain_action"] = _pick(flat, "brain_action.recommended_action", "brain_action")
+
+    for m in MODALITIES:
+        for f in MODALITY_FIELDS:
+            out[f"{m}_{f}"] = _pick(flat, f"fused_emotion.modalities.{m}.{f}", f"modalities.{m}.{f}")
+
+    # fixed dtypes so files written from different sessions share one schema
+    out[_FLOAT_COLUMNS] = out[_FLOAT_COLUMNS].apply(pd.to_numeric, errors="coerce").astype("float64")
+    for col in ("session_id", "emotion", "brain_action") + tuple(f"{m}_emotion" for m in MODALITIES):
+        out[col] = out[col].astype("string")
+    return out[ARCHIVE_COLUMNS]
+
+
+def write_archive(rows, path, session_id=None):
+    """Write one session (or any batch of events) to a Parquet file."""
+    df = events_to_frame(rows, session_id=session_id)
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    df.to_parquet(path, index=False, engine="pyarrow")
+    return path
+
+
+def load_local_session(session_id):
+    """Stream a locally stored session (journal or legacy JSON file)."""
+    path = session_path(session_id, "journal")
+    if journal_segments(path):
+        return read_journal(path)
+    path = session_path(session_id)
+    if os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    return []
+
+
+def archive_session(session_id, out_dir="archive"):
+    """Archive a local session to <out_dir>/session_<id>.parquet."""
+    path = os.path.join(out_dir, f"session_{session_id}.parquet")
+    return write_archive(load_local_session(session_id), path, session_id=session_id)
+
+
+def read_archive(path, columns=None, start=None, end=None, session_ids=None):
+    """
+    Read a Parquet file or a directory of them.
+
+    columns: subset of ARCHIVE_COLUMNS to load (projection)
+    start / end: inclusive timestamp bounds (anything pd.Timestamp accepts)
+    session_ids: only these sessions
+    Filters are pushed down to the Parquet reader, so row groups outside the
+    range are skipped rather than loaded and dropped.
+    """
+    filters = []
+    if start is not None:
+        filters.append(("timestamp", ">=", pd.Timestamp(start)))
+    if end is not None:
+        filters.append(("timestamp", "<=", pd.Timestamp(end)))
+    if session_ids is not None:
+        filters.append(("session_id", "in", list(session_ids)))
+
+    return pd.read_parquet(
+        path,
+        engine="pyarrow",
+        columns=list(columns) if columns else None,
+        filters=filters or None,
+    )
@@ -0,0 +1,234 @@
+# session_system/cohort.py
+"""
+Cross-session cohort analytics.
+
+- Scans many sessions in one pass; each session is reduced to a row of
+  vectorized statistics (pandas / NumPy, no per-event Python loop).
+- Sessions are processed in parallel in a worker pool.
+- Per-session results are cached by a hash of the session file contents,
+  so re-opening the overview only recomputes sessions that changed.
+- An optional start / end time range restricts the cohort to the events in
+  that range (pushed down to the Parquet reader for archives); sessions
+  with no events in range drop out.
+
+Sources: local session_<id>.json / .jsonl timelines and Parquet archives.
+"""
+
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from multimodal_brain.rules import THRESHOLDS
+from session_system.archive import events_to_frame, read_archive
+from session_system.journal import journal_segments, read_journal
+
+# valence histogram bins shared by every session so they can be summed
+VALENCE_BINS = np.linspace(-1.0, 1.0, 11)
+
+
+def content_hash(path):
+    """blake2b over a session's bytes (all journal segments for .jsonl)."""
+    h = hashlib.blake2b(digest_size=16)
+    paths = journal_segments(path) if path.endswith(".jsonl") else [path]
+    for p in paths:
+        with open(p, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+    return h.hexdigest()
+
+
+def load_frame(path, start=None, end=None):
+    """
+    Archive-shaped DataFrame for one session file.
+    start / end: inclusive timestamp bounds, as in read_archive.
+    """
+    if path.endswith(".parquet"):
+        return read_archive(path, columns=["session_id", "timestamp", "emotion", "valence", "arousal"],
+                            start=start, end=end)
+    if path.endswith(".jsonl"):
+        df = events_to_frame(read_journal(path))
+    else:
+        with open(path) as f:
+            df = events_to_frame(json.load(f))
+    if start is not None:
+        df = df[df["timestamp"] >= pd.Timestamp(start)]
+    if end is not None:
+        df = df[df["timestamp"] <= pd.Timestamp(end)]
+    return df
+
+
+def dominant_emotion(emotions, timestamps):
+    """
+    Most frequent label; ties go to the label seen first in time, like
+    analytics.compute_session_metrics and the SQL session metrics.
+    """
+    df = pd.DataFrame({"emotion": emotions, "timestamp": timestamps}).dropna(subset=["emotion"])
+    if df.empty:
+        return "n/a"
+    labels = df.sort_values("timestamp", kind="stable")["emotion"]
+    counts = labels.value_counts()
+    # max() keeps the first of equal counts, and labels are in first-seen order
+    return str(max(labels[~labels.duplicated()], key=counts.get))
+
+
+def session_stats(df, valence_drop=None, arousal_rise=None):
+    """Reduce one session's frame to a flat dict of statistics."""
+    valence_drop = THRESHOLDS["frustration_valence"] if valence_drop is None else valence_drop
+    arousal_rise = THRESHOLDS["frustration_arousal"] if arousal_rise is None else arousal_rise
+
+    v = df["valence"].to_numpy(dtype=np.float64, na_value=0.0)
+    a = df["arousal"].to_numpy(dtype=np.float64, na_value=0.0)
+    n = len(v)
+    spikes = int(np.count_nonzero((v <= valence_drop) & (a >= arousal_rise)))
+    ts = df["timestamp"]
+
+    out = {
+        "events": n,
+        "avg_valence": float(v.mean()) if n else 0.0,
+        "std_valence": float(v.std()) if n else 0.0,
+        "p10_valence": float(np.percentile(v, 10)) if n else 0.0,
+        "p90_valence": float(np.percentile(v, 90)) if n else 0.0,
+        "avg_arousal": float(a.mean()) if n else 0.0,
+        "spikes": spikes,
+        "spike_rate": spikes / n if n else 0.0,
+        "first_ts": ts.min() if n else pd.NaT,
+        "last_ts": ts.max() if n else pd.NaT,
+        "valence_hist": np.histogram(np.clip(v, -1.0, 1.0), bins=VALENCE_BINS)[0].tolist(),
+        "emotion_counts": df["emotion"].value_counts().to_dict() if n else {},
+        "dominant_emotion": dominant_emotion(df["emotion"], ts) if n else "n/a",
+    }
+    return out
+
+
+def _stats_for_path(path, valence_drop, arousal_rise, start=None, end=None):
+    # top-level so it can run in a worker process
+    return session_stats(load_frame(path, start, end), valence_drop, arousal_rise)
+
+
+def _session_id_from_path(path):
+    name = os.path.basename(path)
+    for ext in (".parquet", ".jsonl", ".json"):
+        if name.endswith(ext):
+            name = name[: -len(ext)]
+    return name[len("session_"):] if name.startswith("session_") else name
+
+
+def find_session_files(folders=(".", "archive")):
+    """Local session timelines / archives (one path per session, archives preferred)."""
+    found = {}
+    for folder in folders:
+        if not os.path.isdir(folder):
+            continue
+        for name in sorted(os.listdir(folder)):
+            if not name.startswith("session_") or name.endswith(".rollup.json"):
+                continue
+            if not name.endswith((".json", ".jsonl", ".parquet")):
+                continue
+            path = os.path.join(folder, name)
+            sid = _session_id_from_path(path)
+            if sid not in found or path.endswith(".parquet"):
+                found[sid] = path
+    return list(found.values())
+
+
+class CohortAnalyzer:
+    def __init__(self, max_workers=None, cache_size=2048, valence_drop=None, arousal_rise=None):
+        self.max_workers = max_workers
+        self.cache_size = cache_size
+        self.valence_drop = valence_drop
+        self.arousal_rise = arousal_rise
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0}
+
+    def _cache_get(self, key):
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self.stats["hits"] += 1
+                return self._cache[key]
+            self.stats["misses"] += 1
+            return None
+
+    def _cache_put(self, key, value):
+        with self._lock:
+            self._cache[key] = value
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def analyze_files(self, paths, start=None, end=None):
+        """
+        Returns (per_session DataFrame indexed by session_id, cohort summary dict).
+        start / end: inclusive timestamp bounds on the events counted.
+        """
+        start = pd.Timestamp(start) if start is not None else None
+        end = pd.Timestamp(end) if end is not None else None
+        keys = {p: (content_hash(p), self.valence_drop, self.arousal_rise, start, end) for p in paths}
+        results = {}
+        todo = []
+        for p in paths:
+            cached = self._cache_get(keys[p])
+            if cached is not None:
+                results[p] = cached
+            else:
+                todo.append(p)
+
+        if todo:
+            if len(todo) == 1 or self.max_workers == 1:
+                computed = [_stats_for_path(p, self.valence_drop, self.arousal_rise, start, end) for p in todo]
+            else:
+                with ProcessPoolExecutor(max_workers=self.max_workers) as pool:
+                    computed = list(pool.map(
+                        _stats_for_path, todo,
+                        [self.valence_drop] * len(todo), [self.arousal_rise] * len(todo),
+                        [start] * len(todo), [end] * len(todo),
+                        chunksize=max(1, len(todo) // 32),
+                    ))
+            for p, st in zip(todo, computed):
+                self._cache_put(keys[p], st)
+                results[p] = st
+
+        per_session = pd.DataFrame.from_dict(
+            {
+                _session_id_from_path(p): results[p] for p in paths
+                if results[p]["events"] or (start is None and end is None)
+            },
+            orient="index",
+        )
+        per_session.index.name = "session_id"
+        return per_session, summarize_cohort(per_session)
+
+    def analyze_sessions(self, folders=(".", "archive"), start=None, end=None):
+        return self.analyze_files(find_session_files(folders), start=start, end=end)
+
+
+def summarize_cohort(per_session):
+    """Cohort-level distributions from the per-session table."""
+    if per_session.empty:
+        return {"sessions": 0, "events": 0}
+
+    events = per_session["events"].to_numpy(dtype=np.float64)
+    total = events.sum()
+    weights = events / total if total else np.zeros_like(events)
+
+    mix = pd.DataFrame(list(per_session["emotion_counts"]), index=per_session.index).fillna(0).sum()
+    hist = np.sum(np.array(list(per_session["valence_hist"]), dtype=np.int64), axis=0)
+
+    return {
+        "sessions": int(len(per_session)),
+        "events": int(total),
+        "avg_valence": float(np.dot(weights, per_session["avg_valence"].to_numpy())),
+        "avg_arousal": float(np.dot(weights, per_session["avg_arousal"].to_numpy())),
+        "spikes": int(per_session["spikes"].sum()),
+        "spike_rate": float(per_session["spikes"].sum() / total) if total else 0.0,
+        "emotion_mix": (mix / mix.sum()).sort_values(ascending=False).to_dict() if mix.sum() else {},
+        "valence_hist": hist.tolist(),
+        "most_spikes": per_session["spikes"].sort_values(ascending=False).head(10).to_dict(),
+    }
@@ -0,0 +1,121 @@
+# session_system/journal.py
+"""
+Append-only session journal.
+
+- One compact JSON object per line, written as each event arrives.
+- Flushed on every append; fsync'd every `fsync_every` events or
+  `fsync_interval` seconds so a crash loses at most that window.
+- Rotates to <path>.1, <path>.2, ... once the active file exceeds `max_bytes`.
+- read_journal() streams records back across all segments without loading
+  the whole session. A torn last line is skipped on read and terminated
+  before the next append, so later records stay intact.
+"""
+
+import os
+import re
+import json
+import time
+
+
+def session_path(session_id, storage="json"):
+    """Local file holding a session's timeline for the given storage mode."""
+    ext = "jsonl" if storage == "journal" else "json"
+    return f"session_{session_id}.{ext}"
+
+
+def journal_segments(path):
+    """Rotated segments (oldest first) followed by the active file, if present."""
+    folder = os.path.dirname(path) or "."
+    base = os.path.basename(path)
+    pattern = re.compile(re.escape(base) + r"\.(\d+)$")
+    rotated = []
+    if os.path.isdir(folder):
+        for name in os.listdir(folder):
+            m = pattern.match(name)
+            if m:
+                rotated.append((int(m.group(1)), os.path.join(folder, name)))
+    segments = [p for _, p in sorted(rotated)]
+    if os.path.exists(path):
+        segments.append(path)
+    return segments
+
+
+def read_journal(path, limit=None):
+    """
+    Yield journal records in write order.
+    A torn last line (crash mid-write) is skipped instead of failing the read.
+    """
+    n = 0
+    for seg in journal_segments(path):
+        with open(seg, "r") as f:
+            for line in f:
+                if limit is not None and n >= limit:
+                    return
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    continue
+                n += 1
+                yield rec
+
+
+class SessionJournal:
+    def __init__(self, path, fsync_every=20, fsync_interval=1.0, max_bytes=64 * 1024 * 1024):
+        self.path = path
+        self.fsync_every = max(1, int(fsync_every))
+        self.fsync_interval = fsync_interval
+        self.max_bytes = max_bytes
+        self._f = None
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+    def _open(self):
+        if self._f is None:
+            torn = False
+            if os.path.exists(self.path) and os.path.getsize(self.path) > 0:
+                with open(self.path, "rb") as f:
+                    f.seek(-1, os.SEEK_END)
+                    torn = f.read(1) != b"\n"
+            self._f = open(self.path, "a")
+            # a crash can leave a torn last line: end it, so the next record
+            # starts on a line of its own instead of being glued to the fragment
+            if torn:
+                self._f.write("\n")
+
+    def append(self, record):
+        self._open()
+        self._f.write(json.dumps(record, default=str, separators=(",", ":")) + "\n")
+        self._f.flush()
+        self._pending += 1
+
+        now = time.monotonic()
+        if self._pending >= self.fsync_every or now - self._last_sync >= self.fsync_interval:
+            self.sync()
+
+        if self.max_bytes and self._f.tell() >= self.max_bytes:
+            self.rotate()
+
+    def sync(self):
+        if self._f is None:
+            return
+        self._f.flush()
+        os.fsync(self._f.fileno())
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+    def rotate(self):
+        """Close the active file and move it to the next numbered segment."""
+        self.close()
+        if not os.path.exists(self.path):
+            return
+        n = len(journal_segments(self.path))  # rotated segments + the active file
+        os.replace(self.path, f"{self.path}.{n}")
+
+    def close(self):
+        if self._f is not None:
+            self.sync()
+            self._f.close()
+            self._f = None
@@ -0,0 +1,102 @@
+# session_system/rollup.py
+"""
+Incremental per-session rollup.
+
+SessionManager.log() folds every event into a SessionRollup (running
+valence/arousal sums, emotion counts, spike positions, first/last
+timestamp), so the dashboard can show session metrics in O(1) without
+re-reading the timeline. The rollup is persisted every few events and at
+end_session: as one row in the `session_rollups` table when the DB is
+configured, otherwise as a sidecar file (session_<id>.rollup.json).
+"""
+
+import os
+import json
+from multimodal_brain.rules import THRESHOLDS
+
+
+def rollup_path(session_id):
+    return f"session_{session_id}.rollup.json"
+
+
+class SessionRollup:
+    def __init__(self, session_id, valence_drop=None, arousal_rise=None):
+        self.session_id = session_id
+        self.valence_drop = THRESHOLDS["frustration_valence"] if valence_drop is None else valence_drop
+        self.arousal_rise = THRESHOLDS["frustration_arousal"] if arousal_rise is None else arousal_rise
+        self.events = 0
+        self.sum_valence = 0.0
+        self.sum_arousal = 0.0
+        self.emotions = {}
+        self.spikes = []        # (event index, timestamp)
+        self.first_ts = None
+        self.last_ts = None
+
+    def update(self, emotion, valence, arousal, timestamp):
+        if valence <= self.valence_drop and arousal >= self.arousal_rise:
+            self.spikes.append((self.events, timestamp))
+        self.events += 1
+        self.sum_valence += valence
+        self.sum_arousal += arousal
+        self.emotions[emotion] = self.emotions.get(emotion, 0) + 1
+        if self.first_ts is None:
+            self.first_ts = timestamp
+        self.last_ts = timestamp
+
+    def metrics(self):
+        """Same shape as analytics.compute_session_metrics()."""
+        if not self.events:
+            return {}
+        return {
+            "avg_valence": self.sum_valence / self.events,
+            "avg_arousal": self.sum_arousal / self.events,
+            "dominant_emotion": max(self.emotions, key=self.emotions.get) if self.emotions else "n/a",
+            "events": self.events,
+        }
+
+    def to_dict(self):
+        return {
+            "session_id": self.session_id,
+            "events": self.events,
+            "sum_valence": self.sum_valence,
+            "sum_arousal": self.sum_arousal,
+            "emotions": dict(self.emotions),
+            "spikes": [list(s) for s in self.spikes],
+            "first_ts": self.first_ts,
+            "last_ts": self.last_ts,
+            "valence_drop": self.valence_drop,
+            "arousal_rise": self.arousal_rise,
+        }
+
+    @classmethod
+    def from_dict(cls, d):
+        r = cls(d["session_id"], d.get("valence_drop"), d.get("arousal_rise"))
+        r.events = int(d.get("events") or 0)
+        r.sum_valence = float(d.get("sum_valence") or 0.0)
+        r.sum_arousal = float(d.get("sum_arousal") or 0.0)
+        r.emotions = dict(d.get("emotions") or {})
+        r.spikes = [tuple(s) for s in (d.get("spikes") or [])]
+        r.first_ts = d.get("first_ts")
+        r.last_ts = d.get("last_ts")
+        return r
+
+
+def save_rollup(rollup, path=None):
+    # write-then-rename so a reader never sees a half-written sidecar
+    path = path or rollup_path(rollup.session_id)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(rollup.to_dict(), f, separators=(",", ":"))
+    os.replace(tmp, path)
+    return path
+
+
+def load_rollup(session_id, path=None):
+    path = path or rollup_path(session_id)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path) as f:
+            return SessionRollup.from_dict(json.load(f))
+    except (ValueError, KeyError):
+        return None
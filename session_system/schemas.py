@@ -5,11 +5,12 @@ Simple dataclasses used to store session timeline events.
 """
 
 from dataclasses import dataclass
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 
 @dataclass
 class SessionEvent:
     timestamp: str
     fused_emotion: Dict[str, Any]
     brain_action: Any
+    event_key: Optional[str] = None
 
@@ -1,15 +1,80 @@
+import os
+import time
 import uuid
 import json
+import atexit
+import hashlib
+import threading
+from collections import OrderedDict
 from datetime import datetime
 from session_system.schemas import SessionEvent
 from session_system.db import get_db
+from session_system.write_behind import WriteBehindQueue
+from session_system.journal import SessionJournal, read_journal, session_path
+from session_system.rollup import SessionRollup, save_rollup
+
+
+def event_key(session_id, input_hashes=(), seq=None, client_id=None):
+    """
+    Deterministic idempotency key for one logged event: the same client,
+    session, inputs and sequence number always map to the same key, and two
+    clients never share a key even for identical inputs and sequence numbers.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    for part in (client_id, session_id, *input_hashes, seq):
+        h.update(str(part).encode("utf-8"))
+        h.update(b"\x1f")
+    return h.hexdigest()
+
+
+_writers = {}
+_writers_lock = threading.Lock()
+
+
+def shared_writers(db):
+    """
+    The (emotion_logs, session_rollups) write-behind queues for a DB client.
+    One pair per client and process, shared by every SessionManager, so
+    per-user managers do not each start their own writer threads.
+    """
+    with _writers_lock:
+        pair = _writers.get(id(db))
+        if pair is None:
+            # upserts on event_key make retries / replays idempotent;
+            # rollup snapshots replace the stored row for their session
+            pair = (
+                WriteBehindQueue(db, table="emotion_logs", on_conflict="event_key"),
+                WriteBehindQueue(db, table="session_rollups", on_conflict="session_id", ignore_duplicates=False),
+            )
+            _writers[id(db)] = pair
+            for w in pair:
+                atexit.register(w.close)
+        return pair
 
 
 class SessionManager:
-    def __init__(self):
+    def __init__(self, storage=None, recent_keys=1024, rollup_every=25, rollup_interval=5.0, client_id=None):
+        # "json": keep events in memory, dump one JSON file at end_session
+        # "journal": append each event to session_<id>.jsonl as it arrives
+        self.storage = storage or os.getenv("SESSION_STORAGE", "json")
+        # one manager per client (browser session); part of every event key
+        self.client_id = client_id or uuid.uuid4().hex
         self.session_id = None
         self.events = []
+        self.journal = None
+        self.rollup = None
+        # the rollup is persisted every `rollup_every` events or
+        # `rollup_interval` seconds, and always at end_session
+        self.rollup_every = max(1, int(rollup_every))
+        self.rollup_interval = rollup_interval
+        self._rollup_saved = (0, time.monotonic())
+        # event keys this client logged recently; reruns of the same interaction are dropped
+        self.recent_keys = recent_keys
+        self._recent = OrderedDict()
+        self.duplicates = 0
         self.db = get_db()
+        # DB rows are buffered and bulk-inserted off the request path
+        self.writer, self.rollup_writer = shared_writers(self.db) if self.db else (None, None)
 
     # -------------------------
     # Convert modality objects safely
@@ -28,10 +93,13 @@ class SessionManager:
     # -------------------------
     # Log to Supabase database
     # -------------------------
-    def log_to_db(self, fused_emotion, brain_output):
-        if not self.db:
+    def log_to_db(self, fused_emotion, brain_output, modalities=None, key=None):
+        if not self.writer:
             return  # database not configured
 
+        if modalities is None:
+            modalities = self._serialize_modalities(fused_emotion.modalities)
+
         payload = {
             "session_id": self.session_id,
             "emotion": fused_emotion.final_emotion,
@@ -41,16 +109,14 @@ class SessionManager:
             "brain_action": brain_output.get("recommended_action"),
             "micro_prompt": brain_output.get("micro_prompt"),
             "timestamp": datetime.now().isoformat(),
+            "event_key": key,
 
             # Must be JSON serializable for Supabase
-            "modalities": self._serialize_modalities(fused_emotion.modalities)
+            "modalities": modalities
         }
 
-        try:
-            self.db.table("emotion_logs").insert(payload).execute()
-        except Exception as e:
-            print("\n🚨 DB LOGGING ERROR:", e)
-            print("Payload that failed:", payload)
+        # enqueue only; the write-behind thread retries and spills on failure
+        self.writer.put(payload)
 
     # -------------------------
     # Start a new session
@@ -58,15 +124,46 @@ class SessionManager:
     def start_session(self):
         self.session_id = str(uuid.uuid4())
         self.events = []
+        self.rollup = SessionRollup(self.session_id)
+        self._rollup_saved = (0, time.monotonic())
+        self._recent.clear()
+        if self.storage == "journal":
+            self.journal = SessionJournal(session_path(self.session_id, "journal"))
         return self.session_id
 
     # -------------------------
     # Log event locally + DB
     # -------------------------
-    def log(self, fused_emotion, brain_output):
+    def _seen(self, key):
+        # bounded recent-key filter (LRU order)
+        if key in self._recent:
+            self._recent.move_to_end(key)
+            return True
+        self._recent[key] = True
+        while len(self._recent) > self.recent_keys:
+            self._recent.popitem(last=False)
+        return False
+
+    def log(self, fused_emotion, brain_output, input_hashes=None, seq=None):
+        """
+        Record one event locally and in the DB.
+        With input_hashes / seq the event gets an idempotency key, and a
+        repeat of an already logged key is dropped (returns None).
+        Returns the event key (None for unkeyed events too).
+        """
         if not self.session_id:
             self.start_session()
 
+        key = None
+        if input_hashes is not None or seq is not None:
+            key = event_key(self.session_id, tuple(input_hashes or ()), seq, client_id=self.client_id)
+            if self._seen(key):
+                self.duplicates += 1
+                return None
+
+        # serialize once for both the local timeline and the DB row
+        modalities = self._serialize_modalities(fused_emotion.modalities)
+
         entry = SessionEvent(
             timestamp=datetime.now().isoformat(),
             fused_emotion={
@@ -76,20 +173,33 @@ class SessionManager:
                 "confidence": float(fused_emotion.confidence),
 
                 # serialized modalities
-                "modalities": self._serialize_modalities(fused_emotion.modalities)
+                "modalities": modalities
             },
-            brain_action=brain_output
+            brain_action=brain_output,
+            event_key=key
         )
 
-        self.events.append(entry)
+        if self.journal:
+            self.journal.append(vars(entry))
+        else:
+            self.events.append(entry)
+
+        # O(1) metrics for the dashboard, persisted every few events
+        fe = entry.fused_emotion
+        self.rollup.update(fe["emotion"], fe["valence"], fe["arousal"], entry.timestamp)
+        self.persist_rollup()
 
         # Log to DB (RLS safe)
-        self.log_to_db(fused_emotion, brain_output)
+        self.log_to_db(fused_emotion, brain_output, modalities, key)
+        return key
 
     # -------------------------
     # Return local session timeline
     # -------------------------
     def get_timeline(self):
+        if self.journal:
+            self.journal.sync()
+            return list(read_journal(self.journal.path))
         return self.events
 
     # -------------------------
@@ -99,7 +209,12 @@ class SessionManager:
         if not self.session_id:
             return None
 
-        path = f"session_{self.session_id}.json"
+        if self.journal:
+            # already on disk event by event
+            self.journal.close()
+            return self.journal.path
+
+        path = session_path(self.session_id)
         data = [vars(e) for e in self.events]
 
         with open(path, "w") as f:
@@ -110,14 +225,38 @@ class SessionManager:
     # -------------------------
     # End session
     # -------------------------
+    def persist_rollup(self, force=False):
+        """
+        Save the rollup if `rollup_every` events or `rollup_interval` seconds
+        passed since the last save (always with force=True).
+        With a DB it is enqueued on the rollup write-behind queue; otherwise it
+        goes to the session_<id>.rollup.json sidecar.
+        """
+        if not self.rollup or not self.rollup.events:
+            return
+        saved_events, saved_at = self._rollup_saved
+        due = (
+            self.rollup.events - saved_events >= self.rollup_every
+            or time.monotonic() - saved_at >= self.rollup_interval
+        )
+        if not (force or due):
+            return
+        if self.rollup_writer:
+            self.rollup_writer.put(self.rollup.to_dict())
+        else:
+            save_rollup(self.rollup)
+        self._rollup_saved = (self.rollup.events, time.monotonic())
+
     def end_session(self):
+        self.persist_rollup(force=True)
+        if self.writer:
+            self.writer.flush(timeout=5.0)
+            self.rollup_writer.flush(timeout=5.0)
         path = self.save_local()
         self.session_id = None
         self.events = []
+        self.journal = None
+        self.rollup = None
         return path
 
 
-# Singleton instance
-session_manager = SessionManager()
-
-
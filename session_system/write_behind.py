@@ -0,0 +1,222 @@
+# session_system/write_behind.py
+"""
+Write-behind buffer for Supabase inserts.
+
+- put() only enqueues a row, so logging never waits on the network.
+- A background thread flushes bulk inserts every `batch_size` rows or
+  `flush_interval_ms`, whichever comes first.
+- The queue is bounded: when it is full put() waits briefly (backpressure)
+  and then spills the row to a local JSONL journal instead of growing.
+- Failed flushes are retried with exponential backoff; batches that still
+  fail are spilled to the journal and replayed once the DB is reachable.
+- With on_conflict set, batches are upserted ignoring rows whose key
+  already exists, so retries and replays never duplicate rows. With
+  ignore_duplicates=False the latest row per key replaces the stored one
+  instead (snapshots such as session rollups).
+- An unexpected error in one writer iteration is logged and the loop goes
+  on; torn journal lines are skipped, and put() restarts a writer thread
+  that died anyway.
+"""
+
+import os
+import json
+import time
+import queue
+import threading
+
+
+class WriteBehindQueue:
+    def __init__(
+        self,
+        db,
+        table="emotion_logs",
+        batch_size=50,
+        flush_interval_ms=500,
+        max_pending=5000,
+        put_timeout=0.05,
+        max_retries=4,
+        backoff_base=0.25,
+        backoff_max=8.0,
+        journal_path=None,
+        on_conflict=None,
+        ignore_duplicates=True,
+    ):
+        self.db = db
+        self.table = table
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.put_timeout = put_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.journal_path = journal_path or f"{table}.spill.jsonl"
+        self.on_conflict = on_conflict
+        self.ignore_duplicates = ignore_duplicates
+
+        self._q = queue.Queue(maxsize=max_pending)
+        self._stop = threading.Event()
+        self._journal_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._thread = None
+        self._next_replay = 0.0
+        self.stats = {"queued": 0, "inserted": 0, "batches": 0, "retries": 0, "spilled": 0, "replayed": 0, "skipped": 0}
+
+    # -------------------------
+    # Producer side
+    # -------------------------
+    def put(self, row):
+        """Enqueue one row. Returns False if it had to be spilled to the journal."""
+        self._ensure_started()
+        try:
+            self._q.put(row, timeout=self.put_timeout)
+            self.stats["queued"] += 1
+            return True
+        except queue.Full:
+            self._spill([row])
+            return False
+
+    def flush(self, timeout=None):
+        """Block until every queued row has been written or spilled."""
+        if self._thread is None:
+            return
+        self._ensure_started()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._q.unfinished_tasks:
+            if deadline is not None and time.monotonic() > deadline:
+                return
+            time.sleep(0.01)
+
+    def close(self, timeout=5.0):
+        self.flush(timeout)
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    # -------------------------
+    # Background writer
+    # -------------------------
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name=f"{self.table}-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self._step()
+            except Exception as e:
+                # never let one bad batch / journal kill the writer for good
+                print("\n🚨 DB WRITER ERROR:", e)
+                self._next_replay = time.monotonic() + self.backoff_max
+
+    def _step(self):
+        try:
+            first = self._q.get(timeout=self.flush_interval)
+        except queue.Empty:
+            self._replay_journal()
+            return
+
+        batch = [first]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._q.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+        try:
+            if self._write(batch):
+                self._replay_journal()
+            else:
+                self._spill(batch)
+                self._next_replay = time.monotonic() + self.backoff_max
+        finally:
+            for _ in batch:
+                self._q.task_done()
+
+    def _insert(self, rows):
+        if self.on_conflict:
+            # one row per key: the first one when existing keys are skipped,
+            # the latest one when rows replace what is stored
+            unique = {}
+            for row in rows:
+                key = row.get(self.on_conflict) or id(row)
+                if self.ignore_duplicates:
+                    unique.setdefault(key, row)
+                else:
+                    unique[key] = row
+            self.db.table(self.table).upsert(
+                list(unique.values()), on_conflict=self.on_conflict, ignore_duplicates=self.ignore_duplicates
+            ).execute()
+        else:
+            self.db.table(self.table).insert(rows).execute()
+
+    def _write(self, rows):
+        """Bulk insert with retry + exponential backoff. Returns True on success."""
+        for attempt in range(self.max_retries + 1):
+            try:
+                self._insert(rows)
+                self.stats["inserted"] += len(rows)
+                self.stats["batches"] += 1
+                return True
+            except Exception as e:
+                print("\n🚨 DB LOGGING ERROR:", e)
+                if attempt == self.max_retries:
+                    break
+                self.stats["retries"] += 1
+                delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+                if self._stop.wait(delay):
+                    break
+        return False
+
+    # -------------------------
+    # Local spill journal
+    # -------------------------
+    def _spill(self, rows):
+        with self._journal_lock:
+            with open(self.journal_path, "a") as f:
+                for row in rows:
+                    f.write(json.dumps(row, default=str, separators=(",", ":")) + "\n")
+        self.stats["spilled"] += len(rows)
+
+    def _replay_journal(self):
+        if time.monotonic() < self._next_replay:
+            return
+        replay_path = self.journal_path + ".replay"
+        if not os.path.exists(self.journal_path) and not os.path.exists(replay_path):
+            return
+        # move the journal aside so new spills do not race with the replay
+        with self._journal_lock:
+            if not os.path.exists(replay_path):
+                os.replace(self.journal_path, replay_path)
+
+        rows = []
+        with open(replay_path) as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    rows.append(json.loads(line))
+                except ValueError:
+                    # torn line from a spill cut short: skip it like read_journal does
+                    self.stats["skipped"] += 1
+
+        for i in range(0, len(rows), self.batch_size):
+            batch = rows[i:i + self.batch_size]
+            if not self._write(batch):
+                # still unreachable: put back what is left and try again later
+                self._spill(rows[i:])
+                os.remove(replay_path)
+                self._next_replay = time.monotonic() + self.backoff_max
+                return
+            self.stats["replayed"] += len(batch)
+        os.remove(replay_path)
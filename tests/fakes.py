@@ -0,0 +1,87 @@
+"""Test doubles shared by the test modules."""
+
+import time
+
+import cv2
+import numpy as np
+
+
+class FakeTable:
+    def __init__(self, db, name):
+        self.db = db
+        self.name = name
+        self.rows = None
+
+    def insert(self, rows):
+        self.rows = rows if isinstance(rows, list) else [rows]
+        return self
+
+    def upsert(self, rows, **kwargs):
+        return self.insert(rows)
+
+    def execute(self):
+        if self.db.fail:
+            raise ConnectionError("db down")
+        self.db.inserted.extend(self.rows)
+        self.db.tables.setdefault(self.name, []).extend(self.rows)
+
+
+class FakeDB:
+    """Minimal stand-in for the Supabase client's table().insert/upsert().execute() chain."""
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.inserted = []
+        self.tables = {}
+
+    def table(self, name):
+        return FakeTable(self, name)
+
+
+class FakeLLMClient:
+    """
+    Stand-in for call_llm / stream_llm: returns a canned reply (streamed word
+    by word from .stream) and counts calls.
+    """
+
+    def __init__(self, reply="[Fake Response]", delay=0.0):
+        self.reply = reply
+        self.delay = delay
+        self.calls = 0
+        self.prompts = []
+
+    def __call__(self, prompt):
+        self.calls += 1
+        self.prompts.append(prompt)
+        if self.delay:
+            time.sleep(self.delay)
+        return self.reply
+
+    def stream(self, prompt):
+        self.calls += 1
+        self.prompts.append(prompt)
+        for i, word in enumerate(self.reply.split(" ")):
+            if self.delay:
+                time.sleep(self.delay)
+            yield word if i == 0 else " " + word
+
+
+class MarkerCascade:
+    """
+    Stand-in for the frontal-face CascadeClassifier: the "face" is the
+    bounding box of the bright (> 127) pixels, subject to minSize.
+    Every searched image shape is recorded in `calls`.
+    """
+
+    def __init__(self):
+        self.calls = []
+
+    def detectMultiScale(self, gray, scaleFactor=1.1, minNeighbors=3, minSize=(0, 0)):
+        self.calls.append(gray.shape)
+        points = cv2.findNonZero((gray > 127).astype(np.uint8))
+        if points is None:
+            return ()
+        x, y, w, h = cv2.boundingRect(points)
+        if w < minSize[0] or h < minSize[1]:
+            return ()
+        return np.array([[x, y, w, h]])
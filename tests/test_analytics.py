@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+
+from session_system.analytics import SQLiteAnalytics, compute_session_metrics
+
+
+def _rows(session_id, emotions, start=0, seed=0):
+    rng = np.random.default_rng(seed)
+    return [
+        {
+            "session_id": session_id,
+            "emotion": emotion,
+            "valence": float(rng.uniform(-1, 1)),
+            "arousal": float(rng.uniform(0, 1)),
+            "confidence": 0.8,
+            "brain_action": "continue",
+            "micro_prompt": "",
+            "timestamp": f"2026-10-17T10:{start + i:02d}:00",
+            "modalities": {},
+            "event_key": f"{session_id}:{i}",
+        }
+        for i, emotion in enumerate(emotions)
+    ]
+
+
+# "a" ties sad / happy (sad seen first), "b" is mostly neutral, "c" is the latest session
+SESSIONS = {
+    "a": _rows("a", ["sad", "happy", "happy", "sad", "angry"], start=0, seed=1),
+    "b": _rows("b", ["neutral", "happy", "neutral", "neutral"], start=10, seed=2),
+    "c": _rows("c", ["angry"], start=30, seed=3),
+}
+
+
+@pytest.fixture
+def analytics():
+    db = SQLiteAnalytics()
+    for rows in SESSIONS.values():
+        db.insert(rows)
+    return db
+
+
+@pytest.mark.parametrize("session_id", ["a", "b", "c"])
+def test_session_metrics_match_the_python_path(analytics, session_id):
+    sql = analytics.session_metrics(session_id)
+    py = compute_session_metrics(SESSIONS[session_id])
+    assert sql.keys() == py.keys()
+    assert sql["events"] == py["events"]
+    assert sql["dominant_emotion"] == py["dominant_emotion"]
+    assert sql["avg_valence"] == pytest.approx(py["avg_valence"])
+    assert sql["avg_arousal"] == pytest.approx(py["avg_arousal"])
+
+
+def test_dominant_emotion_ties_go_to_the_first_seen(analytics):
+    assert analytics.session_metrics("a")["dominant_emotion"] == "sad"
+
+
+def test_unknown_session_has_no_metrics(analytics):
+    assert analytics.session_metrics("missing") == {} == compute_session_metrics([])
+
+
+def test_list_sessions_newest_first(analytics):
+    sessions = analytics.list_sessions()
+    assert [s["session_id"] for s in sessions] == ["c", "b", "a"]
+    assert sessions[0]["timestamp"] == "2026-10-17T10:30:00"
+    assert sessions[2]["timestamp"] == "2026-10-17T10:04:00"
+    assert [s["session_id"] for s in analytics.list_sessions(limit=2)] == ["c", "b"]
+
+
+def test_count_rows_ignores_replayed_event_keys(analytics):
+    assert analytics.count_rows() == 10
+    analytics.insert(SESSIONS["c"])
+    assert analytics.count_rows() == 10
@@ -0,0 +1,33 @@
+import subprocess
+import sys
+
+from session_system.archive import load_local_session, read_archive, write_archive
+from session_system.journal import SessionJournal, session_path
+
+
+def test_archive_import_has_no_session_manager_side_effects():
+    # cohort workers import the archive; they must not build a DB client / writer
+    code = (
+        "import sys, session_system.cohort, session_system.archive;"
+        "assert 'session_system.session_manager' not in sys.modules;"
+        "assert 'session_system.db' not in sys.modules"
+    )
+    subprocess.run([sys.executable, "-c", code], check=True)
+
+
+def test_local_journal_session_round_trips_through_parquet(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    journal = SessionJournal(session_path("s1", "journal"))
+    for i in range(3):
+        journal.append({
+            "timestamp": f"2026-01-01T00:00:0{i}",
+            "fused_emotion": {"emotion": "happy", "valence": 0.1 * i, "arousal": 0.2, "confidence": 0.9,
+                              "modalities": {"text": {"emotion": "happy", "confidence": 0.9, "valence": 0.1 * i, "arousal": 0.2}}},
+            "brain_action": {"recommended_action": "continue"},
+        })
+    journal.close()
+
+    path = write_archive(load_local_session("s1"), str(tmp_path / "a.parquet"), session_id="s1")
+    df = read_archive(path, columns=["session_id", "timestamp", "text_valence"], start="2026-01-01T00:00:01")
+    assert df["session_id"].tolist() == ["s1", "s1"]
+    assert df["text_valence"].tolist() == [0.1, 0.2]
@@ -0,0 +1,53 @@
+import io
+
+import numpy as np
+import librosa
+import pytest
+import soundfile as sf
+
+from multimodal_emotion.audio_emotion import TARGET_SR, decode_audio, decode_stats
+
+
+def _wav(sr=TARGET_SR, channels=1, subtype="PCM_16", seconds=0.5, fmt="WAV"):
+    t = np.arange(int(seconds * sr)) / sr
+    y = np.stack([0.5 * np.sin(2 * np.pi * (220 + 110 * c) * t) for c in range(channels)], axis=1)
+    buf = io.BytesIO()
+    sf.write(buf, y.astype(np.float32), sr, subtype=subtype, format=fmt)
+    return buf.getvalue()
+
+
+def _librosa(data):
+    return librosa.load(io.BytesIO(data), sr=TARGET_SR, mono=True)[0]
+
+
+@pytest.mark.parametrize("subtype", ["PCM_16", "PCM_32", "FLOAT"])
+@pytest.mark.parametrize("channels", [1, 2])
+def test_wav_fast_path_matches_librosa_load(subtype, channels):
+    data = _wav(channels=channels, subtype=subtype)
+    before = decode_stats().get("wav_fast", 0)
+
+    y, sr = decode_audio(data)
+
+    assert sr == TARGET_SR
+    assert y.dtype == np.float32
+    assert decode_stats()["wav_fast"] == before + 1
+    np.testing.assert_allclose(y, _librosa(data), atol=1e-6)
+
+
+def test_other_rates_are_resampled_like_librosa():
+    data = _wav(sr=44100)
+    before = decode_stats().get("wav_resampled", 0)
+
+    y, sr = decode_audio(data)
+
+    assert sr == TARGET_SR
+    assert decode_stats()["wav_resampled"] == before + 1
+    np.testing.assert_allclose(y, _librosa(data), atol=1e-4)
+
+
+def test_unsupported_formats_fall_back_to_librosa():
+    for data in (_wav(subtype="PCM_24"), _wav(fmt="FLAC")):
+        before = decode_stats().get("librosa", 0)
+        y, _ = decode_audio(data)
+        assert decode_stats()["librosa"] == before + 1
+        np.testing.assert_allclose(y, _librosa(data), atol=1e-6)
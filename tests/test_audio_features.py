@@ -0,0 +1,44 @@
+import numpy as np
+import librosa
+import pytest
+
+from multimodal_emotion.audio_emotion import (
+    N_FFT,
+    HOP_LENGTH,
+    TARGET_SR,
+    _frame_rms_zcr,
+    extract_features,
+)
+
+
+def _clip(seconds=3.0, sr=TARGET_SR, seed=0):
+    # voiced-looking tone with harmonics, noise, silence and exact zeros
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * sr)) / sr
+    y = 0.3 * np.sin(2 * np.pi * 180 * t) + 0.1 * np.sin(2 * np.pi * 540 * t)
+    y += 0.02 * rng.standard_normal(len(t))
+    y[len(y) // 3: len(y) // 2] = 0.0
+    return y.astype(np.float32)
+
+
+@pytest.mark.parametrize("n", [TARGET_SR * 3, 1000, N_FFT + 1, HOP_LENGTH * 7 + 3])
+def test_frame_rms_zcr_match_librosa(n):
+    y = _clip()[:n]
+    rms, zcr = _frame_rms_zcr(y)
+    np.testing.assert_allclose(rms, librosa.feature.rms(y=y)[0], rtol=1e-5, atol=1e-7)
+    np.testing.assert_allclose(zcr, librosa.feature.zero_crossing_rate(y)[0], atol=1e-12)
+
+
+def test_single_stft_features_match_per_feature_librosa_calls():
+    y, sr = _clip(), TARGET_SR
+    f = extract_features(y, sr, vad=False)
+
+    assert f.rms == pytest.approx(float(np.mean(librosa.feature.rms(y=y))), rel=1e-5)
+    assert f.zcr == pytest.approx(float(np.mean(librosa.feature.zero_crossing_rate(y))), abs=1e-12)
+    assert f.centroid == pytest.approx(float(np.mean(librosa.feature.spectral_centroid(y=y, sr=sr))), rel=1e-5)
+
+    mfcc = librosa.feature.mfcc(y=y, sr=sr, n_mfcc=13)
+    mfcc_score = float(np.mean(np.abs(np.mean(mfcc, axis=1))) / (np.mean(np.abs(np.std(mfcc, axis=1))) + 1e-6))
+    assert f.mfcc_score == pytest.approx(mfcc_score, rel=1e-4)
+    assert f.vad is False and f.voiced_ratio == 1.0
+
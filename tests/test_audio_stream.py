@@ -0,0 +1,70 @@
+import io
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+from multimodal_emotion.audio_emotion import (
+    TARGET_SR,
+    AudioStreamAnalyzer,
+    analyze_audio,
+    analyze_audio_stream,
+)
+
+
+def _clip(seconds, sr, seed=0):
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * sr)) / sr
+    y = 0.3 * np.sin(2 * np.pi * 180 * t) + 0.1 * np.sin(2 * np.pi * 540 * t)
+    return (y + 0.02 * rng.standard_normal(len(t))).astype(np.float32)
+
+
+def _wav(y, sr):
+    buf = io.BytesIO()
+    sf.write(buf, y, sr, format="WAV", subtype="FLOAT")
+    return buf.getvalue()
+
+
+def _close(a, b, tol):
+    assert a.emotion == b.emotion
+    for k in ("confidence", "valence", "arousal"):
+        assert getattr(a, k) == pytest.approx(getattr(b, k), abs=tol)
+
+
+@pytest.mark.parametrize("sr", [TARGET_SR, 22050, 44100])
+def test_chunked_file_analysis_matches_whole_clip(sr):
+    audio = _wav(_clip(4.0, sr), sr)
+    estimates = list(analyze_audio_stream(audio, window_seconds=1.0, block_seconds=0.3, decay=1.0))
+
+    assert len(estimates) == 4
+    _close(estimates[-1], analyze_audio(audio), tol=0.02)
+
+
+def test_path_file_object_and_pcm_chunks_agree(tmp_path):
+    y = _clip(3.0, TARGET_SR)
+    path = tmp_path / "clip.wav"
+    path.write_bytes(_wav(y, TARGET_SR))
+
+    from_path = list(analyze_audio_stream(str(path), window_seconds=1.0))
+    with open(path, "rb") as f:
+        from_file = list(analyze_audio_stream(f, window_seconds=1.0))
+    from_pcm = list(analyze_audio_stream(np.array_split(y, 7), window_seconds=1.0))
+
+    assert [m.to_dict() for m in from_path] == [m.to_dict() for m in from_file]
+    for a, b in zip(from_path, from_pcm):
+        _close(a, b, tol=1e-4)
+
+
+def test_windows_do_not_depend_on_chunk_size():
+    y = _clip(5.6, TARGET_SR)  # five full windows and a 0.6 s tail
+    results = []
+    for n_chunks in (1, 13, 200):
+        analyzer = AudioStreamAnalyzer(window_seconds=1.0)
+        out = [m for chunk in np.array_split(y, n_chunks) for m in analyzer.feed(chunk)]
+        out.append(analyzer.flush())
+        results.append([m.to_dict() for m in out])
+        # memory stays one window whatever the stream length
+        assert analyzer._buf.shape == (analyzer.window,)
+        assert analyzer.windows == 6 and analyzer.elapsed == pytest.approx(len(y) / TARGET_SR)
+
+    assert results[0] == results[1] == results[2]
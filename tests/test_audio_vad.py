@@ -0,0 +1,87 @@
+import io
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+from multimodal_emotion.audio_emotion import (
+    HOP_LENGTH,
+    N_FFT,
+    TARGET_SR,
+    analyze_audio_detailed,
+    detect_voiced_segments,
+    extract_features,
+)
+
+SR = TARGET_SR
+
+
+def _tone(seconds, freq=220.0, amp=0.3):
+    t = np.arange(int(seconds * SR)) / SR
+    return (amp * np.sin(2 * np.pi * freq * t)).astype(np.float32)
+
+
+def _silence(seconds):
+    return np.zeros(int(seconds * SR), dtype=np.float32)
+
+
+def _wav(y):
+    buf = io.BytesIO()
+    sf.write(buf, y, SR, format="WAV", subtype="FLOAT")
+    return buf.getvalue()
+
+
+def test_silence_tone_silence_boundaries():
+    y = np.concatenate([_silence(1.0), _tone(1.0), _silence(1.0)])
+    onset, offset = 1.0, 2.0
+
+    # without hangover the segment is the extent of the voiced frames:
+    # it starts at the left edge of the first frame touching the tone
+    (start, end), = detect_voiced_segments(y, SR, hangover=0)
+    assert onset - N_FFT / SR < start <= onset
+    assert offset <= end < offset + N_FFT / SR
+    assert (start * SR) % HOP_LENGTH == (HOP_LENGTH - N_FFT // 2) % HOP_LENGTH
+
+    # the hangover widens it by up to `hangover` frames on each side
+    (start3, end3), = detect_voiced_segments(y, SR, hangover=3)
+    assert start3 == pytest.approx(start - 3 * HOP_LENGTH / SR)
+    assert end3 == pytest.approx(end + 3 * HOP_LENGTH / SR)
+
+
+def test_segments_are_clipped_and_merged():
+    # voice from the first sample; two tones with a gap the frames straddle
+    y = np.concatenate([_tone(0.5), _silence(0.05), _tone(0.5), _silence(1.0), _tone(0.5)])
+    segments = detect_voiced_segments(y, SR)
+
+    assert segments[0][0] == 0.0
+    assert segments[-1][1] == pytest.approx(len(y) / SR)
+    assert len(segments) == 2
+    assert all(a[1] < b[0] for a, b in zip(segments, segments[1:]))
+
+
+def test_extract_features_uses_the_same_segments():
+    y = np.concatenate([_silence(0.5), _tone(0.8), _silence(0.6), _tone(0.02), _silence(0.6), _tone(0.4)])
+    expected = detect_voiced_segments(y, SR)
+    f = extract_features(y, SR, vad=True)
+
+    assert f.segments == expected
+    assert f.vad is True
+    assert f.voiced_ratio == pytest.approx(sum(e - s for s, e in expected) / (len(y) / SR))
+
+
+def test_runs_shorter_than_min_seconds_are_dropped():
+    y = np.concatenate([_silence(1.0), _tone(0.8), _silence(1.0)])
+    y[int(0.3 * SR):int(0.3 * SR) + 40] = 0.9  # a click touches four frames (~0.13 s)
+    assert len(detect_voiced_segments(y, SR, hangover=0)) == 2
+    (start, end), = detect_voiced_segments(y, SR, hangover=0, min_seconds=0.25)
+    assert start <= 1.0 <= 1.8 <= end
+
+
+def test_vad_is_off_by_default():
+    y = np.concatenate([_silence(1.0), _tone(1.0), _silence(1.0)])
+    assert extract_features(y, SR).vad is False
+
+    default, features = analyze_audio_detailed(_wav(y))
+    ungated, _ = analyze_audio_detailed(_wav(y), vad=False)
+    assert features.vad is False and features.segments == []
+    assert default.to_dict() == ungated.to_dict()
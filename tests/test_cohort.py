@@ -0,0 +1,90 @@
+import json
+
+import pytest
+
+from session_system.analytics import compute_session_metrics
+from session_system.archive import write_archive
+from session_system.cohort import CohortAnalyzer, dominant_emotion, find_session_files
+from session_system.journal import SessionJournal
+
+
+def _event(minute, emotion, valence=0.0, arousal=0.3, day=17):
+    return {
+        "timestamp": f"2026-10-{day:02d}T10:{minute:02d}:00",
+        "fused_emotion": {"emotion": emotion, "valence": valence, "arousal": arousal, "confidence": 0.8},
+        "brain_action": {"recommended_action": "continue"},
+    }
+
+
+# "tie" has two sad and two happy events, sad seen first in time (but
+# written second); "spiky" has one frustration spike on the 18th
+SESSIONS = {
+    "tie": [_event(5, "happy", 0.5), _event(1, "sad", -0.2), _event(2, "sad", -0.3), _event(6, "happy", 0.6)],
+    "spiky": [_event(1, "neutral"), _event(2, "angry", -0.8, 0.9, day=18), _event(3, "neutral", day=18)],
+    "calm": [_event(i, "neutral", 0.1) for i in range(5)],
+}
+
+
+@pytest.fixture
+def folder(tmp_path):
+    with open(tmp_path / "session_tie.json", "w") as f:
+        json.dump(SESSIONS["tie"], f)
+    journal = SessionJournal(str(tmp_path / "session_spiky.jsonl"))
+    for ev in SESSIONS["spiky"]:
+        journal.append(ev)
+    journal.close()
+    write_archive(SESSIONS["calm"], str(tmp_path / "archive" / "session_calm.parquet"), session_id="calm")
+    return tmp_path
+
+
+def _analyze(folder, **kwargs):
+    analyzer = CohortAnalyzer(max_workers=1)
+    return analyzer, analyzer.analyze_sessions(folders=(str(folder), str(folder / "archive")), **kwargs)
+
+
+def test_dominant_emotion_ties_go_to_the_first_seen_in_time():
+    rows = sorted(SESSIONS["tie"], key=lambda r: r["timestamp"])
+    assert compute_session_metrics(rows)["dominant_emotion"] == "sad"
+    assert dominant_emotion(["happy", "sad", "sad", "happy"], [5, 1, 2, 6]) == "sad"
+    assert dominant_emotion(["happy", "sad"], [1, 1]) == "happy"
+    assert dominant_emotion([None, None], [1, 2]) == "n/a"
+
+
+def test_per_session_stats_and_cohort_summary(folder):
+    assert len(find_session_files((str(folder), str(folder / "archive")))) == 3
+    _, (per_session, cohort) = _analyze(folder)
+
+    assert per_session.loc["tie", "dominant_emotion"] == "sad"
+    assert per_session.loc["tie", "avg_valence"] == pytest.approx(0.15)
+    assert per_session.loc["spiky", "spikes"] == 1
+    assert per_session.loc["calm", "events"] == 5
+    assert cohort["sessions"] == 3 and cohort["events"] == 12
+    assert cohort["spikes"] == 1
+    assert cohort["emotion_mix"]["neutral"] == pytest.approx(7 / 12)
+
+
+def test_time_range_filters_events_and_drops_empty_sessions(folder):
+    _, (per_session, cohort) = _analyze(folder, start="2026-10-18", end="2026-10-18 23:59:59")
+    assert list(per_session.index) == ["spiky"]
+    assert per_session.loc["spiky", "events"] == 2
+    assert cohort["events"] == 2
+
+    _, (per_session, _) = _analyze(folder, start="2026-10-17 10:02", end="2026-10-17 10:05")
+    assert per_session["events"].to_dict() == {"tie": 2, "calm": 3}
+    assert per_session.loc["tie", "dominant_emotion"] == "sad"
+
+
+def test_cache_is_per_file_content_and_range(folder):
+    analyzer, _ = _analyze(folder)
+    paths = find_session_files((str(folder), str(folder / "archive")))
+
+    analyzer.analyze_files(paths)
+    assert analyzer.stats == {"hits": 3, "misses": 3}
+    analyzer.analyze_files(paths, start="2026-10-18")
+    assert analyzer.stats["misses"] == 6
+
+    with open(folder / "session_tie.json", "w") as f:
+        json.dump(SESSIONS["tie"][:2], f)
+    per_session, _ = analyzer.analyze_files(paths)
+    assert analyzer.stats["misses"] == 7
+    assert per_session.loc["tie", "events"] == 2
@@ -0,0 +1,35 @@
+from multimodal_emotion.engine import ScoringEngine
+
+
+def test_timeout_recycles_pool_so_next_event_is_scored():
+    engine = ScoringEngine(max_workers=1)
+    try:
+        engine.analyze(text="warm the pool")
+        stuck = engine._pool
+        workers = list(stuck._processes.values())
+
+        # no analyzer can answer in zero seconds: the worker is still busy
+        engine.timeouts["text"] = 0.0
+        res = engine.analyze(text="I am feeling tired and confused today.")
+        assert res["text"] is None  # text's default result
+        assert engine.recycles == 1
+        assert engine._pool is not stuck
+        for proc in workers:
+            proc.join(5)
+            assert not proc.is_alive()
+
+        engine.timeouts["text"] = 30.0
+        res = engine.analyze(text="I love this, it is great!")
+        assert res["text"] is not None
+        assert res["text"].valence > 0
+    finally:
+        engine.shutdown()
+
+
+def test_workers_are_not_forked_from_the_server_process():
+    engine = ScoringEngine(max_workers=1)
+    try:
+        engine.analyze(text="warm the pool")
+        assert engine._pool._mp_context.get_start_method() in ("forkserver", "spawn")
+    finally:
+        engine.shutdown()
@@ -0,0 +1,92 @@
+import numpy as np
+import pandas as pd
+
+from multimodal_brain.episodes import detect_episodes, rolling_mean
+from multimodal_brain.rules import THRESHOLDS
+
+FV, FA, H = THRESHOLDS["frustration_valence"], THRESHOLDS["frustration_arousal"], THRESHOLDS["confusion_window"]
+
+
+def _reference(v, a):
+    # plain state machine: enter past both thresholds, stay within the hysteresis band
+    spans, start = [], None
+    for i, (vi, ai) in enumerate(zip(v, a)):
+        if start is None:
+            if vi <= FV and ai >= FA:
+                start = i
+        elif not (vi <= FV + H and ai >= FA - H):
+            spans.append((start, i - 1))
+            start = None
+            if vi <= FV and ai >= FA:
+                start = i
+    if start is not None:
+        spans.append((start, len(v) - 1))
+    return spans
+
+
+def _spans(v, a, **kwargs):
+    return [(e["start"], e["end"]) for e in detect_episodes(v, a, window=1, **kwargs)]
+
+
+def test_empty_session():
+    assert detect_episodes([], []) == []
+
+
+def test_hovering_at_the_boundary_is_one_episode():
+    v = [0.0, FV, FV + H / 2, FV - 0.1, FV + H / 2, 0.0]
+    a = [0.2, FA, FA, FA - H / 2, FA + 0.1, 0.2]
+    assert _spans(v, a) == [(1, 4)]
+
+
+def test_leaving_the_band_splits_episodes():
+    v = [FV - 0.1, FV + H + 0.01, FV - 0.1, FV - 0.1]
+    a = [0.9, 0.9, 0.9, 0.9]
+    assert _spans(v, a) == [(0, 0), (2, 3)]
+
+
+def test_stay_band_alone_never_starts_an_episode():
+    v = [FV + H / 2] * 5
+    a = [FA] * 5
+    assert _spans(v, a) == []
+
+
+def test_arousal_drop_ends_the_episode():
+    v = [-0.9] * 4
+    a = [0.9, FA - H + 0.01, FA - H - 0.01, 0.9]
+    assert _spans(v, a) == [(0, 1), (3, 3)]
+
+
+def test_min_events_drops_short_blips():
+    v = [-0.9, 0.0, -0.9, -0.9, -0.9, 0.0]
+    a = [0.9] * 6
+    assert _spans(v, a) == [(0, 0), (2, 4)]
+    assert _spans(v, a, min_events=2) == [(2, 4)]
+
+
+def test_severity_peak_and_duration():
+    v = [0.0, -0.6, -0.8, 0.0]
+    a = [0.0, 0.7, 0.6, 0.0]
+    ts = pd.to_datetime(["2026-01-01 00:00:00", "2026-01-01 00:00:10", "2026-01-01 00:00:25", "2026-01-01 00:00:30"])
+    (ep,) = detect_episodes(v, a, ts, window=1)
+    assert (ep["start"], ep["end"], ep["events"]) == (1, 2, 2)
+    assert ep["duration"] == 15.0
+    np.testing.assert_allclose(ep["peak"], (FV + 0.8) + (0.6 - FA))
+    np.testing.assert_allclose(ep["severity"], ((FV + 0.6) + (0.7 - FA) + (FV + 0.8) + (0.6 - FA)) / 2)
+
+
+def test_matches_state_machine_on_random_sessions():
+    rng = np.random.default_rng(0)
+    for _ in range(200):
+        n = int(rng.integers(1, 60))
+        # random walk around the thresholds so entries, stays and exits all occur
+        v = np.clip(FV + np.cumsum(rng.normal(0, 0.08, n)), -1, 1)
+        a = np.clip(FA + np.cumsum(rng.normal(0, 0.08, n)), 0, 1)
+        assert _spans(v, a) == _reference(v, a)
+
+
+def test_smoothing_window_uses_trailing_mean():
+    np.testing.assert_allclose(rolling_mean([1, 2, 3, 4], 2), [1, 1.5, 2.5, 3.5])
+    v, a = [-0.9, 0.1, -0.9], [0.9, 0.9, 0.9]
+    assert detect_episodes(v, a, window=1)[0]["end"] == 0
+    # the window-2 mean of (-0.9, 0.1) stays inside the band
+    assert [(e["start"], e["end"]) for e in detect_episodes(v, a, window=2)] == [(0, 2)]
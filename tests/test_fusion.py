@@ -0,0 +1,69 @@
+import numpy as np
+
+from multimodal_emotion.fusion import MODALITY_ORDER, encode_modalities, fuse, fuse_batch
+from multimodal_emotion.types import Modality
+
+LABELS = ["neutral", "happy", "sad", "angry"]
+
+
+def _random_events(n, seed=0):
+    rng = np.random.default_rng(seed)
+    events = []
+    for _ in range(n):
+        ev = {}
+        for name in MODALITY_ORDER:
+            kind = rng.integers(0, 4)
+            if kind == 0:
+                ev[name] = None
+                continue
+            # coarse confidences make vote ties common; zero confidence is allowed
+            m = Modality(
+                emotion=LABELS[rng.integers(0, len(LABELS))],
+                confidence=float(rng.choice([0.0, 0.25, 0.5, rng.random()])),
+                valence=float(rng.uniform(-1, 1)),
+                arousal=float(rng.random()),
+            )
+            ev[name] = m.to_dict() if kind == 1 else m
+        events.append(ev)
+    return events
+
+
+def _fuse_all(events):
+    cols, names = encode_modalities(events)
+    out = fuse_batch(n_labels=len(names), **cols)
+    return out, names
+
+
+def test_fuse_batch_matches_fuse_exactly():
+    events = _random_events(5000)
+    out, names = _fuse_all(events)
+
+    for i, ev in enumerate(events):
+        ref = fuse(**ev)
+        if ref is None:
+            assert not out["valid"][i]
+            assert out["emotion"][i] == -1
+            continue
+        assert out["valid"][i]
+        assert names[out["emotion"][i]] == ref.final_emotion
+        # bit-for-bit: same summation order as fuse()
+        assert out["valence"][i] == ref.valence
+        assert out["arousal"][i] == ref.arousal
+        assert out["confidence"][i] == ref.confidence
+
+
+def test_vote_ties_go_to_the_first_modality():
+    events = [
+        {"video": Modality("sad", 0.5, -0.5, 0.5), "audio": Modality("happy", 0.5, 0.5, 0.5), "text": None},
+        {"video": None, "audio": Modality("happy", 0.0, 0.5, 0.5), "text": Modality("sad", 0.0, -0.5, 0.5)},
+    ]
+    out, names = _fuse_all(events)
+    assert [names[c] for c in out["emotion"]] == ["sad", "happy"]
+    assert [fuse(**ev).final_emotion for ev in events] == ["sad", "happy"]
+    # all-zero confidence: fuse() leaves valence / arousal at 0
+    assert out["valence"][1] == 0.0 and out["confidence"][1] == 0.0
+
+
+def test_empty_batch():
+    out, _ = _fuse_all([])
+    assert out["valid"].shape == (0,)
@@ -0,0 +1,118 @@
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+import assistant_engine.generator as gen
+from assistant_engine.cache import ReplyCache
+from multimodal_emotion.types import EmotionVector
+from tests.fakes import FakeLLMClient
+
+EMOTION = EmotionVector("neutral", 0.1, 0.3, 0.8, {})
+BRAIN = {"engagement_level": "medium", "cognitive_load": "medium", "predicted_state": "stable"}
+
+
+def _stream(cache, llm, query="same question"):
+    return gen.stream_teaching_reply(query, EMOTION, BRAIN, llm_stream=llm.stream, cache=cache)
+
+
+def test_streamed_reply_is_cached_and_replayed_whole():
+    cache, llm = ReplyCache(), FakeLLMClient("one two three")
+    assert list(_stream(cache, llm)) == ["one", " two", " three"]
+    assert list(_stream(cache, llm)) == ["one two three"]
+    assert llm.calls == 1
+
+
+def test_concurrent_identical_streams_share_one_llm_call():
+    cache, llm = ReplyCache(), FakeLLMClient("a slow streamed reply", delay=0.05)
+    replies = []
+    threads = [threading.Thread(target=lambda: replies.append("".join(_stream(cache, llm)))) for _ in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert replies == ["a slow streamed reply"] * 6
+    assert llm.calls == 1
+    assert cache.stats["coalesced"] + cache.stats["hits"] == 5
+
+
+def test_waiter_takes_over_when_the_leader_stops_early():
+    cache, llm = ReplyCache(), FakeLLMClient("first second", delay=0.05)
+    leader = _stream(cache, llm)
+    assert next(leader) == "first"
+
+    result = []
+    waiter = threading.Thread(target=lambda: result.append("".join(_stream(cache, llm))))
+    waiter.start()
+    time.sleep(0.05)
+    leader.close()  # e.g. the Streamlit script was rerun mid-stream
+    waiter.join(5)
+
+    assert result == ["first second"]
+    assert cache.stats["coalesced"] == 1
+    assert llm.calls == 2
+
+
+def test_waiter_streams_directly_when_the_leader_hangs():
+    cache, release = ReplyCache(wait_timeout=0.1), threading.Event()
+
+    def hung(prompt):
+        release.wait(5)
+        yield "late"
+
+    leader = gen.stream_teaching_reply("same question", EMOTION, BRAIN, llm_stream=hung, cache=cache)
+    runner = threading.Thread(target=lambda: list(leader))
+    runner.start()
+    time.sleep(0.05)
+
+    llm = FakeLLMClient("direct reply")
+    assert list(_stream(cache, llm)) == ["direct", " reply"]
+    assert llm.calls == 1
+    assert cache.stats["wait_timeouts"] == 1
+    assert list(_stream(cache, llm)) == ["direct reply"]
+
+    release.set()
+    runner.join(5)
+
+
+def test_streamed_errors_are_not_cached():
+    cache, llm = ReplyCache(), FakeLLMClient("[LLM ERROR] boom")
+    for _ in range(2):
+        assert "".join(_stream(cache, llm)).startswith("[LLM ERROR]")
+    assert llm.calls == 2 and len(cache) == 0
+
+
+class _SlowAsyncLLM:
+    def __init__(self):
+        self.active = 0
+        self.peak = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, **kwargs):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+
+        async def chunks():
+            try:
+                for word in ("hello", " world"):
+                    await asyncio.sleep(0.02)
+                    yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=word))])
+            finally:
+                self.active -= 1
+        return chunks()
+
+
+def test_astream_llm_is_bounded_by_the_concurrency_limit(monkeypatch):
+    fake = _SlowAsyncLLM()
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setattr(gen, "get_async_client", lambda: fake)
+    monkeypatch.setattr(gen, "LLM_CONCURRENCY", 2)
+
+    async def collect():
+        return "".join([t async for t in gen.astream_llm("prompt")])
+
+    async def main():
+        return await asyncio.gather(*(collect() for _ in range(6)))
+
+    assert asyncio.run(main()) == ["hello world"] * 6
+    assert fake.peak == 2
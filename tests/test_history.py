@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from multimodal_brain.utils import EmotionHistory
+
+
+def _ewma(xs, alpha):
+    out = None
+    for x in xs:
+        out = x if out is None else alpha * x + (1 - alpha) * out
+    return out
+
+
+@pytest.mark.parametrize("maxlen", [1, 2, 10, 300])
+def test_window_statistics_match_numpy_recompute(maxlen):
+    rng = np.random.default_rng(maxlen)
+    hist = EmotionHistory(maxlen=maxlen, ewma_alpha=0.3)
+    v_all = rng.uniform(-1, 1, 5 * maxlen + 7)
+    a_all = rng.uniform(0, 1, len(v_all))
+
+    for i, (v, a) in enumerate(zip(v_all, a_all)):
+        hist.add(v, a)
+        v_win = v_all[max(0, i - maxlen + 1): i + 1]
+        a_win = a_all[max(0, i - maxlen + 1): i + 1]
+
+        np.testing.assert_array_equal(hist.valences, v_win)
+        assert hist.valence_variance() == pytest.approx(np.var(v_win), abs=1e-9)
+        assert hist.arousal_variance() == pytest.approx(np.var(a_win), abs=1e-9)
+        if len(v_win) >= 2:
+            t = np.arange(len(v_win))
+            assert hist.valence_slope() == pytest.approx(np.polyfit(t, v_win, 1)[0], abs=1e-9)
+            assert hist.arousal_slope() == pytest.approx(np.polyfit(t, a_win, 1)[0], abs=1e-9)
+            assert hist.momentum() == pytest.approx((v_win[-1] - v_win[0]) / len(v_win))
+        else:
+            assert hist.valence_slope() == 0.0 and hist.momentum() == 0
+        assert hist.valence_ewma() == pytest.approx(_ewma(v_all[: i + 1], 0.3))
+
+
+def test_no_drift_over_a_long_stream():
+    rng = np.random.default_rng(1)
+    hist = EmotionHistory(maxlen=50)
+    xs = rng.uniform(-1, 1, 100_000) + 1e3  # large offset stresses the running sums
+    for x in xs:
+        hist.add(x, 0.0)
+    win = xs[-50:]
+    assert hist.valence_slope() == pytest.approx(np.polyfit(np.arange(50), win, 1)[0], abs=1e-6)
+    assert hist.valence_variance() == pytest.approx(np.var(win), rel=1e-6)
+
+
+def test_empty_history():
+    hist = EmotionHistory(maxlen=5)
+    assert len(hist) == 0
+    assert hist.valence_slope() == 0.0
+    assert hist.valence_variance() == 0.0
+    assert hist.valence_ewma() == 0.0
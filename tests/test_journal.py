@@ -0,0 +1,72 @@
+import os
+
+import pytest
+
+from session_system import journal as journal_module
+from session_system.journal import SessionJournal, journal_segments, read_journal
+
+
+def _records(start, n):
+    return [{"seq": i, "note": "x" * 40} for i in range(start, start + n)]
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "session_abc.jsonl")
+
+
+def test_rotation_keeps_every_record_in_order(path):
+    journal = SessionJournal(path, max_bytes=1024)
+    for rec in _records(0, 100):
+        journal.append(rec)
+    journal.close()
+
+    segments = journal_segments(path)
+    assert len(segments) > 3
+    assert segments[:3] == [f"{path}.1", f"{path}.2", f"{path}.3"]
+    # every rotated segment stopped at the first append past max_bytes
+    assert all(1024 <= os.path.getsize(p) < 1024 + 100 for p in segments[:-1])
+    assert [r["seq"] for r in read_journal(path)] == list(range(100))
+    assert [r["seq"] for r in read_journal(path, limit=7)] == list(range(7))
+
+
+def test_torn_last_line_is_skipped_and_later_records_survive(path):
+    journal = SessionJournal(path, max_bytes=1024)
+    for rec in _records(0, 30):
+        journal.append(rec)
+    journal.close()
+
+    # crash mid-write: the active file ends halfway through a record
+    size = os.path.getsize(path)
+    with open(path, "r+b") as f:
+        f.truncate(size - 20)
+    torn = [r["seq"] for r in read_journal(path)]
+    assert torn == list(range(29))
+
+    # the writer restarts and keeps appending (and rotating)
+    journal = SessionJournal(path, max_bytes=1024)
+    for rec in _records(30, 30):
+        journal.append(rec)
+    journal.close()
+    assert [r["seq"] for r in read_journal(path)] == list(range(29)) + list(range(30, 60))
+
+
+def test_fsync_every_n_events_or_interval(path, monkeypatch):
+    synced = []
+    now = [100.0]
+    monkeypatch.setattr(journal_module.os, "fsync", lambda fd: synced.append(fd))
+    monkeypatch.setattr(journal_module.time, "monotonic", lambda: now[0])
+
+    journal = SessionJournal(path, fsync_every=5, fsync_interval=10.0)
+    for rec in _records(0, 12):
+        journal.append(rec)
+    assert len(synced) == 2          # after events 5 and 10
+
+    now[0] += 11                     # interval elapsed: the next append syncs
+    journal.append({"seq": 12})
+    assert len(synced) == 3
+    journal.append({"seq": 13})
+    assert len(synced) == 3
+
+    journal.close()                  # close always syncs the tail
+    assert len(synced) == 4
@@ -0,0 +1,68 @@
+from multimodal_emotion import memo as memo_module
+from multimodal_emotion.engine import ScoringEngine
+from multimodal_emotion.memo import AnalyzerMemo, content_hash
+from multimodal_emotion.types import Modality
+
+
+def _m(i):
+    return Modality("happy", 0.5, 0.1 * i, 0.2)
+
+
+def test_content_hash_separates_modalities_and_inputs():
+    assert content_hash("text", "hello") == content_hash("text", "hello")
+    assert content_hash("text", "hello") != content_hash("text", "hello!")
+    assert content_hash("audio", b"hello") != content_hash("video", b"hello")
+    assert content_hash("text", "hello") == content_hash("text", b"hello")
+
+
+def test_hits_return_the_stored_result():
+    memo = AnalyzerMemo()
+    assert memo.get("a") == (False, None)
+    memo.put("a", _m(1))
+    hit, result = memo.get("a")
+    assert hit and result == _m(1)
+    assert memo.stats["hits"] == 1 and memo.stats["misses"] == 1
+
+
+def test_least_recently_used_is_evicted_first():
+    memo = AnalyzerMemo(max_entries=3)
+    for key in "abc":
+        memo.put(key, _m(1))
+    memo.get("a")              # a is now the most recent
+    memo.put("d", _m(2))       # evicts b
+    memo.put("c", _m(3))       # re-put refreshes c instead of growing
+    memo.put("e", _m(4))       # evicts a
+
+    assert [k for k in "abcde" if memo.get(k)[0]] == ["c", "d", "e"]
+    assert memo.get("c")[1] == _m(3)
+    assert len(memo) == 3 and memo.stats["evictions"] == 2
+
+
+def test_ttl_expires_entries(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(memo_module.time, "time", lambda: now[0])
+    memo = AnalyzerMemo(ttl=60)
+    memo.put("a", _m(1))
+
+    now[0] += 59
+    assert memo.get("a")[0]
+    now[0] += 2
+    assert memo.get("a") == (False, None)
+    assert len(memo) == 0 and memo.stats["expired"] == 1
+
+    # no ttl: entries never expire
+    memo = AnalyzerMemo()
+    memo.put("a", _m(1))
+    now[0] += 10 ** 6
+    assert memo.get("a")[0]
+
+
+def test_engine_answers_repeated_inputs_from_the_memo():
+    engine = ScoringEngine(max_workers=1, memo=AnalyzerMemo())
+    try:
+        first = engine.analyze(text="I love this, it is great!")
+        second = engine.analyze(text="I love this, it is great!")
+        assert second["text"] == first["text"]
+        assert engine.memo.stats["hits"] == 1 and len(engine.memo) == 1
+    finally:
+        engine.shutdown()
@@ -0,0 +1,69 @@
+import numpy as np
+
+from multimodal_brain.brain import HISTORY_WINDOW, _analyze
+from multimodal_brain.replay import replay_session, replay_sessions, window_slope
+from multimodal_brain.rules import THRESHOLDS
+from multimodal_brain.utils import EmotionHistory
+from multimodal_emotion.types import EmotionVector
+
+KEYS = ("engagement_level", "cognitive_load", "predicted_state", "recommended_action", "micro_prompt")
+EMOTIONS = ["neutral", "happy", "sadness", "anger", "fear", "surprise"]
+
+
+def _session(n, seed):
+    rng = np.random.default_rng(seed)
+    v = np.clip(np.cumsum(rng.normal(0, 0.1, n)), -1, 1)
+    a = np.clip(0.4 + np.cumsum(rng.normal(0, 0.05, n)), 0, 1)
+    emo = rng.choice(EMOTIONS, n)
+    return v, a, emo
+
+
+def _sequential(v, a, emo, window=HISTORY_WINDOW):
+    # analyze_state() on a fresh history, one event at a time
+    hist = EmotionHistory(maxlen=window)
+    out = []
+    for vi, ai, ei in zip(v, a, emo):
+        out.append(_analyze(EmotionVector(str(ei), float(vi), float(ai), 1.0, {}), hist))
+    return out
+
+
+def _near_threshold(momentum, trend, eps=1e-9):
+    th = THRESHOLDS
+    return (
+        (np.abs(momentum - th["frustration_momentum"]) < eps)
+        | (np.abs(momentum - th["improving_momentum"]) < eps)
+        | (np.abs(trend - th["frustration_arousal_trend"]) < eps)
+    )
+
+
+def test_replay_matches_sequential_analyze_state():
+    for seed in range(20):
+        v, a, emo = _session(400, seed)
+        replay = replay_session(v, a, emo)
+        seq = _sequential(v, a, emo)
+        # slopes only differ by float rounding; skip events sitting on a threshold
+        keep = ~_near_threshold(replay["momentum"], replay["arousal_trend"])
+        for key in KEYS:
+            assert list(np.asarray(replay[key])[keep]) == [s[key] for s, k in zip(seq, keep) if k]
+
+
+def test_window_slope_matches_history_slope():
+    v, _, _ = _session(200, 99)
+    hist = EmotionHistory(maxlen=HISTORY_WINDOW)
+    live = []
+    for x in v:
+        hist.add(x, 0.0)
+        live.append(hist.valence_slope())
+    np.testing.assert_allclose(window_slope(v), live, atol=1e-12)
+
+
+def test_threshold_overrides_and_pool_replay():
+    sessions = {f"s{i}": dict(zip(("valence", "arousal", "emotion"), _session(50, i))) for i in range(3)}
+    serial = replay_sessions(sessions, max_workers=1)
+    pooled = replay_sessions(sessions, max_workers=2)
+    for sid in sessions:
+        assert list(serial[sid]["recommended_action"]) == list(pooled[sid]["recommended_action"])
+
+    v, a, emo = sessions["s0"]["valence"], sessions["s0"]["arousal"], sessions["s0"]["emotion"]
+    never = replay_session(v, a, emo, thresholds={"high_engagement_valence": 2.0})
+    assert "high" not in set(never["engagement_level"])
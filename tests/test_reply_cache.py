@@ -0,0 +1,98 @@
+import threading
+import time
+
+from assistant_engine.cache import ReplyCache, reply_key
+from assistant_engine.generator import generate_teaching_reply
+from multimodal_emotion.types import EmotionVector
+from tests.fakes import FakeLLMClient
+
+EMOTION = EmotionVector("neutral", 0.1, 0.3, 0.8, {})
+BRAIN = {"engagement_level": "medium", "cognitive_load": "medium", "predicted_state": "stable"}
+
+
+def test_hits_and_misses_share_one_llm_call():
+    cache, llm = ReplyCache(), FakeLLMClient("Fractions are parts of a whole.")
+    first = generate_teaching_reply("What is a fraction?", EMOTION, BRAIN, llm=llm, cache=cache)
+    # normalized question: same key despite case / whitespace
+    second = generate_teaching_reply("  what is a   FRACTION? ", EMOTION, BRAIN, llm=llm, cache=cache)
+    assert first == second == "Fractions are parts of a whole."
+    assert llm.calls == 1
+    assert cache.stats["misses"] == 1 and cache.stats["hits"] == 1
+
+
+def test_brain_state_is_part_of_the_key():
+    tired = dict(BRAIN, cognitive_load="high", predicted_state="incoming_frustration")
+    assert reply_key("q", EMOTION, BRAIN) != reply_key("q", EMOTION, tired)
+
+
+def test_entries_expire_after_ttl():
+    cache = ReplyCache(ttl=0.05)
+    cache.put("k", "reply")
+    assert cache.get("k") == "reply"
+    time.sleep(0.1)
+    assert cache.get("k") is None
+    assert len(cache) == 0
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ReplyCache(max_entries=2)
+    cache.put("a", "A")
+    cache.put("b", "B")
+    cache.get("a")          # "b" is now the oldest
+    cache.put("c", "C")
+    assert cache.get("b") is None
+    assert cache.get("a") == "A" and cache.get("c") == "C"
+
+
+def test_error_replies_are_not_cached():
+    cache, llm = ReplyCache(), FakeLLMClient("[LLM ERROR] timeout")
+    for _ in range(2):
+        assert generate_teaching_reply("q", EMOTION, BRAIN, llm=llm, cache=cache).startswith("[LLM ERROR]")
+    assert llm.calls == 2
+    assert len(cache) == 0
+    assert cache.stats["errors"] == 2
+
+
+def test_concurrent_identical_requests_are_coalesced():
+    cache, llm = ReplyCache(), FakeLLMClient("slow reply", delay=0.2)
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(
+            generate_teaching_reply("same question", EMOTION, BRAIN, llm=llm, cache=cache)))
+        for _ in range(8)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert results == ["slow reply"] * 8
+    assert llm.calls == 1
+    assert cache.stats["coalesced"] + cache.stats["hits"] == 7
+
+
+def test_disk_cache_survives_a_new_instance(tmp_path):
+    path = str(tmp_path / "replies.sqlite")
+    ReplyCache(path=path).put("k", "persisted")
+    fresh = ReplyCache(path=path)
+    assert fresh.get("k") == "persisted"
+    assert fresh.stats["disk_hits"] == 1
+
+
+def test_waiter_falls_back_to_a_direct_call_when_the_leader_hangs():
+    cache, release = ReplyCache(wait_timeout=0.1), threading.Event()
+
+    def hung():
+        release.wait(5)
+        return "late reply"
+
+    leader = threading.Thread(target=lambda: cache.get_or_compute("k", hung))
+    leader.start()
+    time.sleep(0.05)
+    started = time.monotonic()
+    assert cache.get_or_compute("k", lambda: "direct reply") == "direct reply"
+    assert time.monotonic() - started < 2
+    assert cache.stats["wait_timeouts"] == 1
+    assert cache.get("k") == "direct reply"
+
+    release.set()
+    leader.join(5)
@@ -0,0 +1,54 @@
+import pytest
+
+import session_system.session_manager as sm
+from multimodal_brain.brain import analyze_state
+from multimodal_emotion.fusion import fuse
+from multimodal_emotion.types import Modality
+from tests.fakes import FakeDB
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def test_per_user_managers_keep_separate_sessions_and_share_writers(workdir, monkeypatch):
+    db = FakeDB()
+    monkeypatch.setattr(sm, "get_db", lambda: db)
+    alice, bob = sm.SessionManager(), sm.SessionManager()
+
+    assert alice.start_session() != bob.start_session()
+    assert alice.writer is bob.writer and alice.rollup_writer is bob.rollup_writer
+
+    # each student's brain history follows only their own events
+    for i in range(6):
+        rising = fuse(text=Modality("happy", 1.0, -0.5 + 0.2 * i, 0.3))
+        falling = fuse(text=Modality("sad", 1.0, 0.5 - 0.2 * i, 0.3 + 0.1 * i))
+        out_a = analyze_state(rising, alice.session_id)
+        out_b = analyze_state(falling, bob.session_id)
+    assert out_a["predicted_state"] == "improving"
+    assert out_b["predicted_state"] == "incoming_frustration"
+
+
+def test_identical_inputs_from_two_clients_are_both_logged(workdir, monkeypatch):
+    db = FakeDB()
+    monkeypatch.setattr(sm, "get_db", lambda: db)
+    alice, bob = sm.SessionManager(client_id="alice"), sm.SessionManager(client_id="bob")
+    alice.start_session()
+    bob.start_session()
+    bob.session_id = alice.session_id  # even a shared session id must not collide
+    fused = fuse(text=Modality("neutral", 0.2, 0.0, 0.1))
+    hashes = ("text-hash",)
+    brain = {"recommended_action": "continue", "micro_prompt": ""}
+
+    key_a = alice.log(fused, brain, input_hashes=hashes, seq=1)
+    key_b = bob.log(fused, brain, input_hashes=hashes, seq=1)
+    assert key_a and key_b and key_a != key_b
+
+    # a rerun of the same interaction by the same client is still dropped
+    assert alice.log(fused, brain, input_hashes=hashes, seq=1) is None
+    assert alice.duplicates == 1 and bob.duplicates == 0
+
+    alice.writer.flush(timeout=5)
+    assert sorted(r["event_key"] for r in db.tables["emotion_logs"]) == sorted([key_a, key_b])
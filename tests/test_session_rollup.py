@@ -0,0 +1,75 @@
+import os
+
+import pytest
+
+import session_system.session_manager as sm
+from multimodal_emotion.fusion import fuse
+from multimodal_emotion.types import Modality
+from session_system.analytics import SQLiteAnalytics
+from session_system.rollup import SessionRollup, load_rollup, rollup_path
+from tests.fakes import FakeDB
+
+BRAIN = {"recommended_action": "continue", "micro_prompt": ""}
+
+
+def _fused(valence=0.2, arousal=0.3, emotion="happy"):
+    return fuse(text=Modality(emotion, 0.8, valence, arousal))
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def test_sidecar_is_saved_every_n_events_not_every_log(workdir, monkeypatch):
+    monkeypatch.setattr(sm, "get_db", lambda: None)
+    manager = sm.SessionManager(rollup_every=10, rollup_interval=3600)
+    sid = manager.start_session()
+    writes = []
+    real_save = sm.save_rollup
+    monkeypatch.setattr(sm, "save_rollup", lambda r: writes.append(r.events) or real_save(r))
+
+    for _ in range(25):
+        manager.log(_fused(), BRAIN)
+    assert writes == [10, 20]
+    assert load_rollup(sid).events == 20
+
+    manager.end_session()
+    assert writes == [10, 20, 25]
+    assert load_rollup(sid).metrics()["events"] == 25
+
+
+def test_db_mode_sends_rollups_through_the_write_behind_queue(workdir, monkeypatch):
+    db = FakeDB()
+    monkeypatch.setattr(sm, "get_db", lambda: db)
+    manager = sm.SessionManager(rollup_every=5, rollup_interval=3600)
+    sid = manager.start_session()
+
+    for i in range(12):
+        manager.log(_fused(valence=-0.8, arousal=0.9, emotion="angry") if i % 4 == 0 else _fused(), BRAIN)
+    manager.end_session()
+    manager.writer.close()
+    manager.rollup_writer.close()
+
+    assert not os.path.exists(rollup_path(sid))
+    assert len(db.tables["emotion_logs"]) == 12
+    snapshots = [r["events"] for r in db.tables["session_rollups"]]
+    assert snapshots[-1] == 12 and set(snapshots) <= {5, 10, 12}
+    assert len(db.tables["session_rollups"][-1]["spikes"]) == 3
+
+
+def test_sqlite_rollups_match_the_supabase_shape():
+    analytics = SQLiteAnalytics()
+    rollup = SessionRollup("s1")
+    rollup.update("happy", 0.5, 0.2, "t0")
+    analytics.upsert_rollups([rollup.to_dict()])
+    rollup.update("angry", -0.9, 0.9, "t1")
+    analytics.upsert_rollups([rollup.to_dict()])
+
+    row = analytics.session_rollup("s1")
+    assert row == rollup.to_dict()
+    restored = SessionRollup.from_dict(row)
+    assert restored.metrics() == rollup.metrics()
+    assert restored.spikes == [(1, "t1")]
+    assert analytics.session_rollup("missing") is None
@@ -0,0 +1,171 @@
+import cv2
+import numpy as np
+import pytest
+
+from multimodal_emotion import video_emotion
+from multimodal_emotion.video_emotion import (
+    analyze_video_frame,
+    analyze_video_frames,
+    iter_video_frames,
+    VideoEmotionTracker,
+)
+from multimodal_emotion.types import Modality
+from tests.fakes import MarkerCascade
+
+
+def _frames(n, shape=(720, 960, 3), seed=0):
+    rng = np.random.default_rng(seed)
+    return [rng.integers(0, 256, size=shape, dtype=np.uint8) for _ in range(n)]
+
+
+def _marker_frame(box, shape=(720, 960, 3), seed=0):
+    # dark frame with a bright, textured "face" inside box = (x, y, w, h)
+    rng = np.random.default_rng(seed)
+    frame = np.zeros(shape, dtype=np.uint8)
+    x, y, w, h = box
+    region = frame[y:y + h, x:x + w]
+    region[:] = rng.integers(170, 256, size=region.shape, dtype=np.uint8)
+    return frame
+
+
+@pytest.fixture
+def marker_cascade(monkeypatch):
+    cascade = MarkerCascade()
+    monkeypatch.setattr(video_emotion, "face_cascade", cascade)
+    return cascade
+
+
+def _jpeg(rgb):
+    ok, buf = cv2.imencode(".jpg", cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR))
+    assert ok
+    return buf.tobytes()
+
+
+def test_iter_video_frames_yields_one_result_list_per_batch():
+    batches = list(iter_video_frames(iter(_frames(7)), batch_size=3))
+    assert [len(res) for res, _ in batches] == [3, 3, 1]
+    assert all(len(res) == len(tim) for res, tim in batches)
+    assert batches[0][1][0]["working_size"] == (640, 480)
+
+
+def test_batched_scores_match_single_frame_path():
+    frames = _frames(4)
+    encoded = [_jpeg(f) for f in frames]
+    single = [analyze_video_frame(b) for b in encoded]
+
+    from_bytes, _ = analyze_video_frames(encoded, batch_size=2)
+    assert [m.to_dict() for m in from_bytes] == [m.to_dict() for m in single]
+
+    # reused buffers must not leak one frame into the next
+    from_arrays, _ = analyze_video_frames(frames, batch_size=2)
+    fresh = [analyze_video_frames([f])[0][0] for f in frames]
+    assert [m.to_dict() for m in from_arrays] == [m.to_dict() for m in fresh]
+
+
+def test_batched_bytes_match_single_frame_path_on_detected_faces(marker_cascade):
+    frames = [_marker_frame((200 + 40 * i, 150, 240, 260), seed=i) for i in range(4)]
+    encoded = [_jpeg(f) for f in frames]
+    single = [analyze_video_frame(b) for b in encoded]
+    assert len(marker_cascade.calls) == 4
+
+    # the stub found a face in every frame, so these are real face scores
+    fallback = Modality("neutral", 0.25, 0.0, 0.18).to_dict()
+    assert all(m.to_dict() != fallback for m in single)
+
+    batched, _ = analyze_video_frames(encoded, batch_size=3)
+    assert [m.to_dict() for m in batched] == [m.to_dict() for m in single]
+
+
+def test_undecodable_frame_falls_back_to_neutral():
+    results, timings = analyze_video_frames([b"not an image"])
+    assert results[0].emotion == "neutral"
+    assert timings[0]["working_size"] is None
+
+
+def test_face_found_at_working_size_maps_back_to_full_resolution(marker_cascade):
+    # 1920x1440 frame searched at 640x480 (scale 1/3)
+    box = (600, 450, 480, 540)
+    gray = cv2.cvtColor(_marker_frame(box, shape=(1440, 1920, 3)), cv2.COLOR_RGB2GRAY)
+
+    assert video_emotion._detect_face(gray) == box
+    assert marker_cascade.calls == [(480, 640)]
+
+    # a box off the 3-pixel grid comes back within one working pixel
+    box = (601, 452, 397, 419)
+    gray = cv2.cvtColor(_marker_frame(box, shape=(1440, 1920, 3)), cv2.COLOR_RGB2GRAY)
+    found = video_emotion._detect_face(gray)
+    assert all(abs(a - b) <= 3 for a, b in zip(found, box))
+
+    # a face touching the border is clamped to the frame
+    box = (1500, 1101, 420, 340)
+    gray = cv2.cvtColor(_marker_frame(box, shape=(1440, 1920, 3)), cv2.COLOR_RGB2GRAY)
+    x, y, w, h = video_emotion._detect_face(gray)
+    assert (x, y, x + w, y + h) == (1500, 1101, 1920, 1440)
+
+
+def test_min_size_is_given_in_full_resolution_pixels(marker_cascade):
+    gray = cv2.cvtColor(_marker_frame((600, 450, 150, 150), shape=(1440, 1920, 3)), cv2.COLOR_RGB2GRAY)
+    assert video_emotion._detect_face(gray, min_size=(120, 120)) is not None
+    assert video_emotion._detect_face(gray, min_size=(180, 180)) is None
+
+
+def test_face_crop_is_normalized_before_scoring(marker_cascade, monkeypatch):
+    seen = []
+    monkeypatch.setattr(video_emotion, "_score_face", lambda face: seen.append(face.shape))
+
+    for box in [(600, 450, 480, 540), (90, 60, 96, 120)]:
+        analyze_video_frame(_jpeg(_marker_frame(box, shape=(1440, 1920, 3))))
+    assert seen == [video_emotion.FACE_SIZE[::-1]] * 2
+
+
+def _gray_marker(box, shape=(480, 640)):
+    return cv2.cvtColor(_marker_frame(box, shape=shape + (3,)), cv2.COLOR_RGB2GRAY)
+
+
+def test_tracker_follows_a_moving_face_between_keyframes(marker_cascade):
+    tracker = VideoEmotionTracker(keyframe_interval=5)
+    boxes = [(100 + 8 * i, 120 + 3 * i, 110, 130) for i in range(12)]
+    for box in boxes:
+        tracker.update(_gray_marker(box))
+        # no drift: the tracked box is the marker's box on every frame
+        assert tracker.box == box
+
+    # one search per frame; full-frame ones on frames 0 and 6 (a keyframe, then 5 ROI frames)
+    full = [i for i, shape in enumerate(marker_cascade.calls) if shape == (480, 640)]
+    assert full == [0, 6]
+    assert tracker.stats == {"frames": 12, "full_detections": 2, "roi_detections": 10, "lost": 0}
+    # ROI searches only see a padded window around the last box
+    assert all(s[0] < 480 and s[1] < 640 for s in marker_cascade.calls if s != (480, 640))
+
+
+def test_tracker_falls_back_to_full_detection_when_the_face_jumps(marker_cascade):
+    tracker = VideoEmotionTracker(keyframe_interval=10)
+    tracker.update(_gray_marker((60, 60, 110, 130)))
+    tracker.update(_gray_marker((70, 64, 110, 130)))
+    assert tracker.stats["roi_detections"] == 1
+
+    # the face leaves the ROI: the ROI search finds nothing, a full search finds it
+    tracker.update(_gray_marker((450, 300, 110, 130)))
+    assert tracker.box == (450, 300, 110, 130)
+    assert tracker.stats["lost"] == 1 and tracker.stats["full_detections"] == 2
+    assert tracker.tracking_confidence == 1.0
+
+
+def test_tracker_re_detects_when_overlap_drops_below_min_iou(marker_cascade):
+    tracker = VideoEmotionTracker(keyframe_interval=10, roi_padding=1.0, min_iou=0.5)
+    tracker.update(_gray_marker((200, 150, 110, 130)))
+    # still inside the padded ROI, but overlapping the old box by less than min_iou
+    tracker.update(_gray_marker((270, 190, 110, 130)))
+    assert tracker.stats["lost"] == 1 and tracker.stats["full_detections"] == 2
+    assert tracker.box == (270, 190, 110, 130)
+
+
+def test_tracker_without_a_face_returns_the_fallback_and_keeps_searching(marker_cascade):
+    tracker = VideoEmotionTracker(keyframe_interval=3)
+    res = tracker.update(np.zeros((480, 640), dtype=np.uint8))
+    assert res.to_dict() == Modality("neutral", 0.25, 0.0, 0.18).to_dict()
+    assert tracker.box is None and tracker.tracking_confidence == 0.0
+
+    tracker.update(_gray_marker((100, 100, 110, 130)))
+    assert tracker.box == (100, 100, 110, 130)
+    assert tracker.stats["full_detections"] == 2
@@ -0,0 +1,88 @@
+import json
+import threading
+
+from session_system.write_behind import WriteBehindQueue
+from tests.fakes import FakeDB
+
+
+def _queue(db, tmp_path, **kwargs):
+    kwargs.setdefault("flush_interval_ms", 10)
+    return WriteBehindQueue(db, journal_path=str(tmp_path / "spill.jsonl"), **kwargs)
+
+
+def test_rows_are_written_in_batches(tmp_path):
+    db = FakeDB()
+    q = _queue(db, tmp_path, batch_size=10)
+    for i in range(25):
+        assert q.put({"i": i})
+    q.flush(timeout=5)
+    q.close()
+    assert [r["i"] for r in db.inserted] == list(range(25))
+
+
+def test_torn_spill_line_is_skipped_on_replay(tmp_path):
+    journal = tmp_path / "spill.jsonl"
+    journal.write_text(json.dumps({"i": 1}) + "\n" + '{"i": 2, "tor' + "\n" + json.dumps({"i": 3}) + "\n")
+    db = FakeDB()
+    q = _queue(db, tmp_path)
+
+    q.put({"i": 4})
+    q.flush(timeout=5)
+    q.close()
+
+    assert sorted(r["i"] for r in db.inserted) == [1, 3, 4]
+    assert q.stats["skipped"] == 1
+    assert not journal.exists()
+
+
+def test_writer_survives_an_unexpected_error(tmp_path):
+    db = FakeDB()
+    q = _queue(db, tmp_path)
+    calls = []
+    real_replay = q._replay_journal
+
+    def flaky_replay():
+        calls.append(1)
+        if len(calls) == 1:
+            raise OSError("disk hiccup")
+        real_replay()
+
+    q._replay_journal = flaky_replay
+    q.put({"i": 1})
+    q.flush(timeout=5)
+    q.put({"i": 2})
+    q.flush(timeout=5)
+
+    assert q._thread.is_alive()
+    assert [r["i"] for r in db.inserted] == [1, 2]
+    q.close()
+
+
+def test_put_restarts_a_dead_writer(tmp_path):
+    db = FakeDB()
+    q = _queue(db, tmp_path)
+    dead = threading.Thread(target=lambda: None)
+    dead.start()
+    dead.join()
+    q._thread = dead
+
+    q.put({"i": 1})
+    q.flush(timeout=5)
+
+    assert q._thread is not dead
+    assert [r["i"] for r in db.inserted] == [1]
+    q.close()
+
+
+def test_failed_batches_spill_and_replay_later(tmp_path):
+    db = FakeDB(fail=True)
+    q = _queue(db, tmp_path, max_retries=0, backoff_max=0.0)
+    q.put({"i": 1})
+    q.flush(timeout=5)
+    assert q.stats["spilled"] == 1
+
+    db.fail = False
+    q.put({"i": 2})
+    q.flush(timeout=5)
+    q.close()
+    assert sorted(r["i"] for r in db.inserted) == [1, 2]